@@ -1,80 +1,632 @@
+import contextlib
+import cProfile
+import json
 import os
-import random
+import time
 
 import numpy as np
-from matplotlib import pyplot as plt
-from video_creator import assemble_video
+from checkpoint import load_checkpoint, rng_state, save_checkpoint, set_rng_state
+from event_log import EventLogWriter
+from first_passage import first_passage_table
+from growth_metrics import GrowthMetrics
+from lattice import Boundary, Lattice, NeighborType, Stencil, get_stencil
+from result_cache import ResultCache
+from storage import (PackedGrid, allocate_array, allocate_grid, occupied_coordinates, pack_grid, place_walkers,
+                     sidecar_path)
+from telemetry import Telemetry
+from video_creator import AsyncVideoSink, Backpressure
 from enum import Enum, auto
-from matplotlib.patches import RegularPolygon
-from matplotlib.collections import PatchCollection
+from typing import NamedTuple
 
 
-class NeighborType(Enum):
-    EIGHT_NEIGHBORS = auto()
-    FOUR_NEIGHBORS = auto()
-    SIX_NEIGHBORS_TRIANGULAR = auto()  # New type for 6-neighbor triangular lattice
+class Engine(Enum):
+    LOOP = auto()  # Reference engine: walkers are moved one at a time
+    BATCH = auto()  # Vectorized engine: all mobile walkers are moved in one NumPy step
 
 
-def plot_hexagonal(grid, save_plot_name=None, save_plot_dir=None, iteration=None):
+ENGINE_VERSION = 3  # Part of the result cache key: bump whenever the same inputs give different results
+
+
+def _batch_step(lattice: Lattice, cells, frontier, pos, status, mobile, telemetry: Telemetry = None) -> int:
     """
-    Optimized version of plotting the grid with a hexagonal layout.
-    Uses PolyCollection for faster drawing of hexagons.
+    Advances every mobile walker (the compacted index array `mobile`) by one step at once and
+    returns the number of walkers glued. `cells` and `frontier` are flat views of the lattice.
+    Sticking is synchronous: walkers test the cluster as it was before this step's sticks.
+    The sticky check is timed as its own phase when `telemetry` is given.
     """
-    n, _ = grid.shape
-    fig, ax = plt.subplots(figsize=(8, 8))
-
-    hex_radius = 1  # Radius of each hexagon
-    x_spacing = np.sqrt(3) * hex_radius  # Horizontal distance between hexagon centers
-    y_spacing = 1.5 * hex_radius  # Vertical distance between hexagon centers (staggered)
-
-    # Precompute the x and y coordinates for even and odd rows
-    hexagons = []
-    colors = []
-
-    for i in range(n):
-        for j in range(n):
-            # Adjust x-coordinate for staggered rows
-            x = j * x_spacing
-            y = i * y_spacing
-            if i % 2 == 1:  # Shift odd rows
-                x += x_spacing / 2
-
-            # Set color based on grid value
-            if grid[i, j] == 2:  # Sticky points
-                color = 'red'
-            elif grid[i, j] == 1:  # Mobile walkers
-                color = 'blue'
+    if mobile.size == 0:
+        return 0
+
+    target = lattice.step(pos[mobile], np.random.randint(lattice.n_moves, size=mobile.size))
+
+    # A ghost cell means the walker crossed the edge: absorbed, or rejected when reflecting
+    crossed = lattice.is_ghost(target)
+    if lattice.boundary == Boundary.ABSORBING and crossed.any():
+        gone = mobile[crossed]
+        cells[pos[gone][cells[pos[gone]] == 1]] = 0
+        status[gone] = 0
+
+    # Moves onto the cluster are rejected; when several walkers claim the same cell only one moves
+    movers = np.random.permutation(np.flatnonzero(~crossed & (cells[target] != 2)))
+    _, first = np.unique(target[movers], return_index=True)
+    movers = movers[first]
+
+    moved = mobile[movers]
+    cells[pos[moved][cells[pos[moved]] == 1]] = 0  # Never erase cluster cells
+    pos[moved] = target[movers]
+    mobile = mobile[status[mobile] == 1]
+    cells[pos[mobile]] = np.where(cells[pos[mobile]] == 2, 2, 1)  # Re-mark walkers that shared a vacated cell
+
+    # Array-wide sticky check is a single frontier lookup per walker
+    with telemetry.phase('sticky') if telemetry is not None else contextlib.nullcontext():
+        stuck = mobile[frontier[pos[mobile]]]
+        cells[pos[stuck]] = 2
+        status[stuck] = 2
+        lattice.mark_frontier(frontier, pos[stuck])
+    return stuck.size
+
+
+TAIL_HALF_WIDTHS = (16, 8, 4)  # Square half-widths for first-passage jumps in the tail phase, largest first
+TAIL_THRESHOLDS = {Engine.LOOP: 0, Engine.BATCH: 16}  # Mobile walker count that starts the tail phase (0 never)
+
+
+class _TailPhase:
+    """
+    Per-walker stepping for the last few mobile walkers.
+    A walker whose surrounding square holds no cluster or frontier cell jumps straight to the square's
+    boundary, with exit cell and step count drawn from the first-passage law (to within its tolerance),
+    and sleeps until the global iteration catches up. A stick near a sleeper interrupts it at the position
+    it would have reached by then, so the walk statistics match single steps to within that tolerance.
+    """
+
+    def __init__(self, lattice: Lattice, cells, frontier, n_walkers, iteration, seconds_per_iteration,
+                 clearance_path: str = None, cells_per_chunk: int = 2 ** 20):
+        n = lattice.n
+        self.lattice = lattice
+        self.seconds_per_iteration = seconds_per_iteration  # Cost of the main engine's last iterations
+        move_dx, move_dy = lattice.stencil.move_dx, lattice.stencil.move_dy
+        self.stencil = (tuple(map(tuple, move_dx.tolist())), tuple(map(tuple, move_dy.tolist())))
+        self.half_widths = tuple(w for w in TAIL_HALF_WIDTHS if 2 * w + 1 <= n)
+        if n % 2 and (move_dx[0] != move_dx[1]).any():
+            self.half_widths = ()  # Row parity does not survive the periodic wrap on odd triangular lattices
+        self.cap = max(self.half_widths, default=1)
+
+        # Chebyshev distance to the nearest cluster or frontier cell, capped at the largest half-width.
+        # Built a block of rows at a time, each with cap - 1 wrapped rows of margin on both sides
+        self.grid = cells.reshape(lattice.width, lattice.width)[:n, :n]
+        self.frontier = frontier.reshape(lattice.width, lattice.width)[:n, :n]
+        self.clearance = allocate_array((n, n), np.int8, clearance_path)
+        margin = self.cap - 1
+        rows_per_chunk = max(cells_per_chunk // n, 2 * self.cap)
+        for start in range(0, n, rows_per_chunk):
+            stop = min(start + rows_per_chunk, n)
+            rows = np.arange(start - margin, stop + margin) % n
+            reach = (self.grid[rows] == 2) | self.frontier[rows]
+            clearance = np.where(reach, 0, self.cap).astype(np.int8)
+            for d in range(1, self.cap):
+                grown = reach.copy()
+                grown[1:] |= reach[:-1]
+                grown[:-1] |= reach[1:]
+                reach = grown | np.roll(grown, 1, axis=1) | np.roll(grown, -1, axis=1)
+                clearance[reach & (clearance > d)] = d
+            clearance = clearance[margin:margin + stop - start]
+            if lattice.boundary != Boundary.PERIODIC:
+                # Squares must also stay inside the lattice, boundary ring included
+                i, j = np.ogrid[start:stop, :n]
+                clearance = np.minimum(clearance, np.minimum(np.minimum(i, n - 1 - i), np.minimum(j, n - 1 - j)))
+            self.clearance[start:stop] = clearance
+        offsets = np.arange(-self.cap + 1, self.cap)
+        self._offsets = offsets
+        self._kernel = np.maximum(np.abs(offsets)[:, None], np.abs(offsets)[None, :])
+
+        self.wake = np.full(n_walkers, -1)  # Iteration at which a sleeping walker lands, -1 when awake
+        self.start = np.zeros(n_walkers, dtype=int)
+        self.steps = np.zeros(n_walkers, dtype=int)
+        self.target = np.zeros(n_walkers, dtype=int)
+        self.table = [None] * n_walkers
+        self.stats = {'tail_start_iteration': iteration, 'tail_jumps': 0, 'tail_interrupts': 0,
+                      'tail_single_steps': 0, 'tail_steps_skipped': 0, 'tail_iterations_skipped': 0}
+        self._started = time.perf_counter()
+
+    def _move(self, cells, pos, i, target):
+        if cells[pos[i]] == 1:
+            cells[pos[i]] = 0
+        if cells[target] != 2:
+            cells[target] = 1
+        pos[i] = target
+
+    def _shifted(self, cell, du, dv):
+        n = self.lattice.n
+        x, y = self.lattice.coordinates(cell)
+        return self.lattice.index((x + du) % n, (y + dv) % n)
+
+    def step(self, cells, frontier, pos, status, active, iteration) -> int:
+        """Advances the active walkers by one iteration and returns the number of walkers glued."""
+        lattice = self.lattice
+        n_stuck = 0
+        for i in active:
+            if self.wake[i] > iteration:
+                continue  # Still on its way to the square boundary
+            if self.wake[i] == iteration:
+                self.wake[i] = -1
+                self._move(cells, pos, i, self.target[i])
             else:
-                color = 'none'  # Empty cells will be transparent
-
-            # Add a hexagonal patch at the (x, y) position
-            hexagon = RegularPolygon((x, y), numVertices=6, radius=hex_radius * 0.95,
-                                     orientation=np.radians(30))
-            hexagons.append(hexagon)
-            colors.append(color)
-
-    # Create a collection of hexagons with corresponding colors
-    collection = PatchCollection(hexagons, facecolor=colors, edgecolor='k', linewidth=0.5, match_original=True)
-    ax.add_collection(collection)
-
-    # Set limits for x and y to match the grid
-    ax.set_xlim(-x_spacing / 2, n * x_spacing)
-    ax.set_ylim(-y_spacing / 2, n * y_spacing)
-
-    ax.set_aspect('equal')
-    ax.set_axis_off()  # Hide the axes for a cleaner look
-
-    # Save the plot if save_plot_name is provided
-    if save_plot_name and save_plot_dir:
-        if iteration is not None:
-            # Add iteration number to filename for video frames
-            save_path = f'{save_plot_dir}\\{save_plot_name}_iter_{iteration:04d}.png'
-        else:
-            save_path = f'{save_plot_dir}\\{save_plot_name}.png'
-        ax.set_title(f'{save_plot_name}')
-        fig.savefig(save_path)
+                clearance = self.clearance[lattice.coordinates(pos[i])]
+                half_width = next((w for w in self.half_widths if clearance >= w), 0)
+                if half_width:
+                    table = first_passage_table(half_width, int(lattice.row_parity(pos[i])), *self.stencil)
+                    du, dv, steps = table.sample_exit()
+                    self.table[i], self.start[i], self.steps[i] = table, iteration, steps
+                    self.target[i] = self._shifted(pos[i], du, dv)
+                    self.wake[i] = iteration + steps - 1
+                    self.stats['tail_jumps'] += 1
+                    self.stats['tail_steps_skipped'] += steps
+                    continue
+                target = lattice.step_one(int(pos[i]), np.random.randint(lattice.n_moves))
+                self.stats['tail_single_steps'] += 1
+                if lattice.is_ghost(target):
+                    if lattice.boundary == Boundary.ABSORBING:
+                        cells[pos[i]] = 0 if cells[pos[i]] == 1 else cells[pos[i]]
+                        status[i] = 0
+                        continue
+                elif cells[target] != 2:
+                    self._move(cells, pos, i, target)
+
+            if frontier[pos[i]]:
+                cells[pos[i]] = 2  # Stick the walker
+                status[i] = 2
+                n_stuck += 1
+                lattice.mark_frontier(frontier, pos[i:i + 1])
+                self._on_stick(cells, pos, i, iteration)
+        mobile = active[status[active] == 1]
+        cells[pos[mobile]] = np.where(cells[pos[mobile]] == 2, 2, 1)  # Re-mark walkers that shared a vacated cell
+        return n_stuck
+
+    def _on_stick(self, cells, pos, stuck, iteration):
+        n = self.lattice.n
+        # Newly blocked cells lie next to the stuck walker
+        x, y = self.lattice.coordinates(pos[stuck])
+        near_x = (x + np.array([-1, -1, -1, 0, 0, 0, 1, 1, 1])) % n
+        near_y = (y + np.array([-1, 0, 1, -1, 0, 1, -1, 0, 1])) % n
+        blocked = (self.grid[near_x, near_y] == 2) | self.frontier[near_x, near_y]
+        near_x, near_y = near_x[blocked], near_y[blocked]
+        for bx, by in zip(near_x, near_y):
+            window = np.ix_((bx + self._offsets) % n, (by + self._offsets) % n)
+            self.clearance[window] = np.minimum(self.clearance[window], self._kernel)
+
+        for w in np.flatnonzero(self.wake >= iteration):
+            table = self.table[w]
+            wx, wy = self.lattice.coordinates(pos[w])
+            du = (near_x - wx + n // 2) % n - n // 2
+            dv = (near_y - wy + n // 2) % n - n // 2
+            if not (np.maximum(np.abs(du), np.abs(dv)) <= table.half_width).any():
+                continue
+            # Walkers before the stuck one have already taken this iteration's step
+            elapsed = iteration - self.start[w] + (1 if w < stuck else 0)
+            du, dv = table.sample_position(elapsed)
+            self.wake[w] = -1
+            self._move(cells, pos, w, self._shifted(pos[w], du, dv))
+            self.stats['tail_interrupts'] += 1
+            self.stats['tail_steps_skipped'] -= self.steps[w] - elapsed
+
+    def fast_forward(self, iteration, active, max_iterations):
+        """Skips ahead to the next landing when every active walker is asleep."""
+        wake = self.wake[active]
+        if active.size == 0 or (wake <= iteration).any():
+            return iteration
+        skip_to = wake.min() - 1
+        if max_iterations is not None:
+            skip_to = min(skip_to, max_iterations - 1)
+        if skip_to > iteration:
+            self.stats['tail_iterations_skipped'] += skip_to - iteration
+            iteration = skip_to
+        return iteration
+
+    def state(self) -> dict:
+        """Checkpoint entries that let restore() continue the tail phase exactly."""
+        state = {'tail_clearance': self.clearance, 'tail_wake': self.wake, 'tail_start': self.start,
+                 'tail_steps': self.steps, 'tail_target': self.target,
+                 'tail_seconds_per_iteration': self.seconds_per_iteration,
+                 'tail_seconds': time.perf_counter() - self._started,
+                 # Tables are cached per (half-width, start parity), so those two numbers identify them
+                 'tail_table_width': np.array([0 if t is None else t.half_width for t in self.table]),
+                 'tail_table_parity': np.array([0 if t is None else t.parity for t in self.table])}
+        state.update({f'tail_stat_{key}': value for key, value in self.stats.items()})
+        return state
+
+    def restore(self, state: dict):
+        self.clearance[:] = state['tail_clearance']
+        self.wake[:], self.start[:] = state['tail_wake'], state['tail_start']
+        self.steps[:], self.target[:] = state['tail_steps'], state['tail_target']
+        self.table = [None if width == 0 else first_passage_table(int(width), int(parity), *self.stencil)
+                      for width, parity in zip(state['tail_table_width'], state['tail_table_parity'])]
+        self.stats = {key: state[f'tail_stat_{key}'] for key in self.stats}
+        self._started = time.perf_counter() - float(state['tail_seconds'])
+
+    def walker_steps(self) -> int:
+        """Walker steps simulated so far, jumped over or taken one at a time."""
+        return self.stats['tail_steps_skipped'] + self.stats['tail_single_steps']
+
+    def summary(self, iteration) -> dict:
+        stats = dict(self.stats)
+        stats['tail_seconds'] = time.perf_counter() - self._started
+        # Versus running every iteration the tail covered, skipped ones included, at the main engine's
+        # cost per iteration just before the tail started
+        covered = iteration - self.stats['tail_start_iteration']
+        stats['tail_seconds_saved'] = covered * self.seconds_per_iteration - stats['tail_seconds']
+        return stats
+
+
+def _plot_grid(grid, neighbor_type, save_plot_dir, save_plot_name):
+    from plotting import plot_grid  # Only runs that save plots load matplotlib
+    plot_grid(grid, neighbor_type, save_plot_dir, save_plot_name)
+
+
+EVENT_LOG_FILES = ('seeds', 'events', 'snapshots')  # .npy files of an event log directory kept in cache entries
+
+
+def _cache_entry(grid, n, start: PackedGrid, summary: dict, event_log: str = None, video_path: str = None,
+                 video_key: str = None) -> dict:
+    """
+    Result cache entry of a finished run: the start and final lattices (packed), the RNG state after
+    the run, the run summary and stats as JSON and optionally the event log files and encoded video.
+    """
+    final = pack_grid(grid, n)
+    entry = {'cluster_bits': final.cluster, 'walker_bits': final.walkers,
+             'start_cluster_bits': start.cluster, 'start_walker_bits': start.walkers,
+             'summary': json.dumps(summary, default=lambda value: value.item()),  # NumPy scalars as Python ones
+             **rng_state()}
+    if event_log is not None:
+        for name in EVENT_LOG_FILES:
+            entry[f'log_{name}'] = np.load(os.path.join(event_log, f'{name}.npy'))
+        with open(os.path.join(event_log, 'meta.json')) as f:
+            entry['log_meta'] = f.read()
+    if video_path is not None:
+        with open(video_path, 'rb') as f:
+            entry['video'] = np.frombuffer(f.read(), dtype=np.uint8)
+        entry['video_key'] = video_key
+    return entry
+
+
+def _restore_cache_entry(entry: dict, grid, n, event_log: str = None, video_path: str = None) -> np.ndarray:
+    """
+    Writes a cache entry back: the final lattice into `grid`, the RNG state, the event log files and
+    the video. Returns the start lattice.
+    """
+    grid[:n, :n] = PackedGrid(n, entry['cluster_bits'], entry['walker_bits']).unpack()[:n, :n]
+    set_rng_state(entry)
+    if event_log is not None:
+        os.makedirs(event_log, exist_ok=True)
+        for name in EVENT_LOG_FILES:
+            np.save(os.path.join(event_log, f'{name}.npy'), entry[f'log_{name}'])
+        with open(os.path.join(event_log, 'meta.json'), 'w') as f:
+            f.write(entry['log_meta'])
+    if video_path is not None:
+        with open(video_path, 'wb') as f:
+            f.write(entry['video'].tobytes())
+    return PackedGrid(n, entry['start_cluster_bits'], entry['start_walker_bits']).unpack()
+
+
+def _check_checkpoint(state: dict, n, n_walkers, lattice: Lattice, engine: Engine):
+    """Raises ValueError when a checkpoint was written by a simulation with different settings."""
+    stencil = lattice.stencil
+    if (state['n'] != n or state['n_walkers'] != n_walkers or state['engine'] != engine.name
+            or state['boundary'] != lattice.boundary.name
+            or not all(np.array_equal(state[key], getattr(stencil, key))
+                       for key in ('move_dx', 'move_dy', 'stick_dx', 'stick_dy'))):
+        raise ValueError("Checkpoint does not match the simulation settings.")
+
+
+class Snapshot(NamedTuple):
+    """
+    State of an AggregationSimulation after an iteration. `grid` is a read-only view of the live
+    lattice, so it changes with the next step: copy it to keep it.
+    """
+    iteration: int
+    glued: int
+    mobile: int
+    grid: np.ndarray
+
+
+class StickEvent(NamedTuple):
+    """Walkers that stuck in the step leading to `iteration`, with the cells they stuck on."""
+    iteration: int
+    walkers: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
 
-    plt.close(fig)
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class AggregationSimulation:
+    """
+    Diffusion-limited aggregation of `n_walkers` random walkers on an n x n lattice, advanced on demand.
+
+    The simulation owns the lattice, frontier and walker arrays; `grid`, `frontier`, `positions`,
+    `status` and `mobile` are read-only views of them, so inspecting the state copies nothing.
+    step(k) runs k iterations, run_until(predicate) runs until predicate(simulation) holds and stream()
+    is a generator of Snapshot (and StickEvent) records, computed only as the caller pulls them.
+    aggregate() is this class plus plots, video, checkpoints, caching and progress reports.
+
+    Moves only avoid cluster cells, as in the original loop, so several walkers can share a cell.
+    `grid` shows such a cell as 1 while any of them is left on it, and as 2 once one has stuck there;
+    `positions` has every walker.
+
+    The arguments are those of aggregate(). `state` is a loaded checkpoint to continue from, and
+    `telemetry` times the placement, stepping, sticky, metrics and logging phases.
+    """
+
+    def __init__(self,
+                 n: int,
+                 n_walkers: int,
+                 sticky_points: list[tuple[int, int]] | np.ndarray = None,
+                 normal_distribution: float = None,
+                 neighbor_type: NeighborType | Stencil = NeighborType.EIGHT_NEIGHBORS,
+                 engine: Engine = Engine.LOOP,
+                 boundary: Boundary = Boundary.PERIODIC,
+                 tail_threshold: int = None,
+                 grid_path: str = None,
+                 metrics: GrowthMetrics = None,
+                 event_log: str = None,
+                 snapshot_interval: int = None,
+                 state: dict = None,
+                 telemetry: Telemetry = None):
+        self.n = n
+        self.n_walkers = n_walkers
+        self.engine = engine
+        self.tail_threshold = TAIL_THRESHOLDS[engine] if tail_threshold is None else tail_threshold
+        self.metrics = metrics
+        self.snapshot_interval = snapshot_interval
+        self.telemetry = Telemetry() if telemetry is None else telemetry
+
+        # Flat-index topology: neighbor tables and ghost-cell boundaries
+        self.lattice = lattice = Lattice.from_neighbor_type(n, neighbor_type, boundary)
+
+        self._grid = allocate_grid(n, grid_path)  # Lattice array, one byte per cell (memory-mapped with grid_path)
+        self._grid_path = grid_path  # The frontier and tail clearance arrays are memory-mapped next to it
+        self._cells = self._grid.reshape(-1)  # Flat view used by the walker loops
+        self._pos = np.zeros(n_walkers, dtype=lattice.index_dtype)  # Walker position as a flat lattice index
+        self._status = np.ones(n_walkers, dtype=np.uint8)  # 1 mobile, 2 glued, 0 absorbed
+
+        # Counters
+        self.iteration, self.n_glued = 0, 0
+        self._walker_steps = 0
+
+        # Continue a checkpoint of the same simulation
+        if state is not None:
+            _check_checkpoint(state, n, n_walkers, lattice, engine)
+            PackedGrid(n, state['cluster_bits'], state['walker_bits']).unpack(out=self._grid)
+            self._pos[:], self._status[:] = state['pos'], state['status']
+            self.iteration, self.n_glued, self._walker_steps = state['iteration'], state['n_glued'], state['walker_steps']
+            set_rng_state(state)
+
+        with self.telemetry.phase('placement'):
+            if state is None:
+                # Add sticky points, given as (i, j) pairs or as a boolean mask
+                if isinstance(sticky_points, np.ndarray) and sticky_points.dtype == bool:
+                    self._grid[:n, :n][sticky_points[:n, :n]] = 2
+                else:
+                    seeds = np.asarray(sticky_points, dtype=int).reshape(-1, 2)
+                    self._grid[seeds[:, 0], seeds[:, 1]] = 2  # Introduce sticky nodes
+
+            # Cells adjacent to the cluster under the sticking stencil; updated locally on every stick
+            self._frontier = allocate_array((lattice.size,), bool, sidecar_path(grid_path, 'frontier'))
+            seed_x, seed_y = occupied_coordinates(self._grid, n, 2)  # Read a block of rows at a time
+            lattice.mark_frontier(self._frontier, lattice.index(seed_x, seed_y))
+
+        # Live fractal statistics, updated with the cells stuck in each iteration
+        if metrics is not None:
+            metrics.add(seed_x, seed_y)
+            metrics.record(self.iteration)
+
+        if state is None:
+            # Place walkers using normal distribution if specified, else randomly
+            with self.telemetry.phase('placement'):
+                x, y = np.divmod(place_walkers(self._grid, n, n_walkers, normal_distribution), n)
+                self._pos[:] = lattice.index(x, y)
+                self._cells[self._pos] = 1
+
+        # Stick events (and walker snapshots) for offline replays
+        self.log = None
+        if event_log is not None:
+            resumed_log = state is not None and os.path.exists(os.path.join(event_log, 'events.npy'))
+            self.log = EventLogWriter(event_log, n, seed_x, seed_y, neighbor_type=getattr(neighbor_type, 'name', None),
+                                      snapshot_interval=snapshot_interval,
+                                      resume_iteration=self.iteration if resumed_log else None)
+            if not resumed_log:
+                mobile = np.flatnonzero(self._status == 1)
+                self.log.snapshot(self.iteration, mobile, *lattice.coordinates(self._pos[mobile]))
+
+        self._active = np.flatnonzero(self._status == 1)  # Compacted index of mobile walkers
+        self.last_stuck = np.zeros(0, dtype=self._active.dtype)  # Walkers glued by the last advance()
+        self.tail = None  # Tail phase state once few walkers are left
+        self._seconds_per_iteration = 0.0  # Moving average over the recent iterations before the tail phase
+        if state is not None and 'tail_wake' in state:
+            self.tail = _TailPhase(lattice, self._cells, self._frontier, n_walkers, self.iteration,
+                                   state['tail_seconds_per_iteration'], sidecar_path(grid_path, 'clearance'))
+            self.tail.restore(state)
+
+    @property
+    def grid(self) -> np.ndarray:
+        """(n + 2, n + 2) lattice: 2 on cluster cells, 1 on cells holding a mobile walker."""
+        return _read_only(self._grid)
+
+    @property
+    def frontier(self) -> np.ndarray:
+        """(n + 2, n + 2) bool mask of the cells where a walker sticks."""
+        return _read_only(self._frontier.reshape(self._grid.shape))
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Flat lattice index of every walker (lattice.coordinates() gives rows and columns)."""
+        return _read_only(self._pos)
+
+    @property
+    def status(self) -> np.ndarray:
+        """Status of every walker: 1 mobile, 2 glued, 0 absorbed."""
+        return _read_only(self._status)
+
+    @property
+    def mobile(self) -> np.ndarray:
+        """Indices of the mobile walkers."""
+        return _read_only(self._active)
+
+    @property
+    def done(self) -> bool:
+        return self._active.size == 0
+
+    @property
+    def walker_steps(self) -> int:
+        """Walker steps simulated so far, tail phase jumps included."""
+        return self._walker_steps + (self.tail.walker_steps() if self.tail is not None else 0)
+
+    def advance(self, limit: int = None) -> int:
+        """
+        Runs one iteration and returns the number of walkers glued. In the tail phase the iterations
+        that follow while every walker is asleep are skipped as well, but never past iteration `limit`.
+        """
+        if self._active.size == 0:
+            return 0
+        lattice, cells, frontier, pos, status = self.lattice, self._cells, self._frontier, self._pos, self._status
+        active, telemetry = self._active, self.telemetry
+        if self.tail is None and active.size <= self.tail_threshold:
+            self.tail = _TailPhase(lattice, cells, frontier, self.n_walkers, self.iteration,
+                                   self._seconds_per_iteration, sidecar_path(self._grid_path, 'clearance'))
+        started = time.perf_counter()
+        if self.metrics is not None or (self.tail is None and self.engine == Engine.LOOP):
+            # Walkers can share a cell, so one may be standing on a cell another has already stuck on
+            on_cluster = pos[active][cells[pos[active]] == 2]
+
+        n_glued = 0
+        with telemetry.phase('stepping'):
+            if self.tail is not None:
+                n_glued += self.tail.step(cells, frontier, pos, status, active, self.iteration)  # Sticky checks included
+            elif self.engine == Engine.BATCH:
+                self._walker_steps += active.size
+                n_glued += _batch_step(lattice, cells, frontier, pos, status, active, telemetry)
+            else:
+                self._walker_steps += active.size
+                periodic = lattice.boundary == Boundary.PERIODIC  # Periodic steps never end on a ghost cell
+                for i in active:  # Loop over mobile walkers only
+                    # One table lookup gives the new position on every lattice type
+                    cell = int(pos[i])
+                    target = lattice.step_one(cell, np.random.randint(lattice.n_moves))
+
+                    if not periodic and lattice.is_ghost(target):  # Crossed a non-periodic edge
+                        if lattice.boundary == Boundary.ABSORBING:
+                            cells[cell] = 0  # Remove walker
+                            status[i] = 0
+                            continue
+                    elif cells[target] != 2:
+                        cells[target] = 1  # Update lattice
+                        cells[cell] = 0  # Move walker
+                        pos[i] = target
+
+                    if frontier[pos[i]]:  # Sticky check for every lattice type
+                        with telemetry.phase('sticky'):
+                            cells[pos[i]] = 2  # Stick the walker
+                            status[i] = 2
+                            n_glued += 1
+                            lattice.mark_frontier(frontier, pos[i:i + 1])
+                # A walker leaving a cell it shared zeroes it: put back the sticks and the walkers left on it
+                cells[on_cluster] = 2
+                cells[pos[active[status[active] == 2]]] = 2
+                mobile = active[status[active] == 1]
+                cells[pos[mobile]] = np.where(cells[pos[mobile]] == 2, 2, 1)
+
+        flags = status[active]
+        self.last_stuck = active[flags == 2]
+        if self.last_stuck.size > 0 and (self.metrics is not None or self.log is not None):
+            x, y = lattice.coordinates(pos[self.last_stuck])
+            if self.metrics is not None:
+                with telemetry.phase('metrics'):
+                    # Each cell once: walkers sharing a cell may stick on it together or on top of an earlier stick
+                    added = np.setdiff1d(pos[self.last_stuck], on_cluster)
+                    self.metrics.add(*lattice.coordinates(added))
+                    self.metrics.record(self.iteration + 1)
+            if self.log is not None:
+                with telemetry.phase('logging'):
+                    self.log.stick(self.iteration + 1, self.last_stuck, x, y)
+        self._active = active[flags == 1]
+        if self.tail is not None:
+            self.iteration = self.tail.fast_forward(self.iteration, self._active, limit)
+        else:
+            self._seconds_per_iteration += 0.1 * (time.perf_counter() - started - self._seconds_per_iteration)
+        self.iteration += 1
+        self.n_glued += n_glued
+        if self.log is not None and self.snapshot_interval and self.iteration % self.snapshot_interval == 0:
+            with telemetry.phase('logging'):
+                self.log.snapshot(self.iteration, self._active, *lattice.coordinates(pos[self._active]))
+        return n_glued
+
+    def step(self, k: int = 1) -> int:
+        """Runs k iterations, fewer if every walker is gone first, and returns the number of walkers glued."""
+        target = self.iteration + k
+        n_glued = 0
+        while self._active.size > 0 and self.iteration < target:
+            n_glued += self.advance(target)
+        return n_glued
+
+    def run_until(self, predicate, max_iterations: int = None) -> bool:
+        """
+        Steps until predicate(self) is true, every walker is gone or iteration `max_iterations` is
+        reached. Returns whether the predicate was met.
+        """
+        while not predicate(self):
+            if self._active.size == 0 or (max_iterations is not None and self.iteration >= max_iterations):
+                return False
+            self.advance(max_iterations)
+        return True
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(self.iteration, self.n_glued, self._active.size, self.grid)
+
+    def stream(self, every: int = 1, max_iterations: int = None, events: bool = False):
+        """
+        Generator that runs the simulation as it is consumed: yields a Snapshot now, then one every
+        `every` iterations and one at the end, and with `events` a StickEvent after every iteration
+        with sticks. Stops when every walker is gone or at iteration `max_iterations`.
+        """
+        yield self.snapshot()
+        while self._active.size > 0 and (max_iterations is None or self.iteration < max_iterations):
+            before = self.iteration
+            self.advance(max_iterations)
+            if events and self.last_stuck.size > 0:
+                yield StickEvent(self.iteration, self.last_stuck, *self.lattice.coordinates(self._pos[self.last_stuck]))
+            if self.iteration // every > before // every or self._active.size == 0:
+                yield self.snapshot()
+
+    def checkpoint_state(self) -> dict:
+        """Checkpoint entries from which AggregationSimulation(state=...) continues this run exactly."""
+        lattice = self.lattice
+        packed = pack_grid(self._grid, self.n)  # Two bits per cell
+        state = {'n': self.n, 'n_walkers': self.n_walkers, 'engine': self.engine.name,
+                 'move_dx': lattice.stencil.move_dx, 'move_dy': lattice.stencil.move_dy,
+                 'stick_dx': lattice.stencil.stick_dx, 'stick_dy': lattice.stencil.stick_dy,
+                 'boundary': lattice.boundary.name,
+                 'cluster_bits': packed.cluster, 'walker_bits': packed.walkers, 'pos': self._pos,
+                 'status': self._status, 'iteration': self.iteration, 'n_glued': self.n_glued,
+                 'walker_steps': self._walker_steps, **rng_state()}
+        if self.tail is not None:
+            state.update(self.tail.state())
+        return state
+
+    def stats(self) -> dict:
+        """Iterations, glued and absorbed walkers, and the tail phase statistics once it has started."""
+        stats = {'iterations': self.iteration, 'glued': self.n_glued,
+                 'absorbed': int(np.count_nonzero(self._status == 0))}
+        if self.tail is not None:
+            stats.update(self.tail.summary(self.iteration))
+        return stats
+
+    def close(self):
+        """Finishes the event log, if any."""
+        if self.log is not None:
+            self.log.close(self.iteration)
 
 
 def aggregate(n: int,
@@ -82,162 +634,181 @@ def aggregate(n: int,
               max_iterations: int = None,
               save_plot_dir: str = None,
               save_plot_name: str = None,
-              sticky_points: list[tuple[int, int]] = None,
+              sticky_points: list[tuple[int, int]] | np.ndarray = None,
               create_video: bool = False,
               normal_distribution: float = None,
-              neighbor_type: NeighborType = NeighborType.EIGHT_NEIGHBORS):
-    tmp_dir = ""
+              neighbor_type: NeighborType | Stencil = NeighborType.EIGHT_NEIGHBORS,
+              engine: Engine = Engine.LOOP,
+              boundary: Boundary = Boundary.PERIODIC,
+              tail_threshold: int = None,
+              stats: dict = None,
+              checkpoint_path: str = None,
+              checkpoint_interval: float = 60.0,
+              resume: bool = False,
+              video_stride: int = 1,
+              video_backpressure: Backpressure = Backpressure.COALESCE,
+              metrics: GrowthMetrics = None,
+              grid_path: str = None,
+              event_log: str = None,
+              snapshot_interval: int = None,
+              progress=None,
+              telemetry_path: str = None,
+              profile_path: str = None,
+              cache: ResultCache = None,
+              seed: int = None,
+              headless: bool = False):
+    """
+    Runs diffusion-limited aggregation of `n_walkers` random walkers on an n x n lattice and returns the
+    (n + 2, n + 2) grid, 2 on cluster cells and 1 on walkers still mobile. The simulation itself is an
+    AggregationSimulation; use that class directly to step it, inspect its state or stream it.
+
+    Progress is reported every 100 iterations and at the end as a record with the iteration, glued and
+    mobile counts, walker steps per second and the seconds spent in each phase (placement, stepping,
+    sticky, metrics, logging, checkpoint, rendering and encoding; video frames are rendered and encoded
+    on a background thread, so those two overlap the others). Records go to `progress`, or to the
+    process-wide reporter of telemetry.set_reporter(), or are printed; `telemetry_path` also appends
+    them to a JSON-lines file. `profile_path` runs the simulation under cProfile and dumps its stats
+    there (pstats format). `stats` receives AggregationSimulation.stats() and the phase seconds, and
+    with a video the frames written and those lost to backpressure (video_frames, video_frames_dropped).
+
+    With a ResultCache, a run whose inputs and starting np.random state match a cached one restores its
+    grid, stats, event log, video and final RNG state instead of simulating, then redraws the plots; a
+    missed run stores them. The key covers every input that changes the result plus ENGINE_VERSION, so
+    plot names only matter for the cached video. Resumed runs and runs feeding GrowthMetrics always
+    simulate. `seed` seeds np.random first, which makes repeated runs hit the cache.
+
+    `grid_path` memory-maps the lattice to a .npy file, and the frontier and tail phase arrays to
+    <name>_frontier.npy and <name>_clearance.npy next to it. The cluster is scanned a block of rows
+    at a time, so the simulation then holds O(n_walkers) in RAM. Checkpoints still pack the lattice
+    in RAM, at a quarter of the grid's bytes, plots and video render the whole lattice, and GrowthMetrics
+    keeps box flags worth a third of the grid's bytes.
+
+    The simulation itself only needs NumPy: matplotlib is imported when the first plot is drawn and
+    OpenCV when the first video is opened. `headless` skips the start and end plots, so batch jobs
+    that only want the grid load neither.
+    """
+    profiler = None
+    if profile_path is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    telemetry = Telemetry(progress, telemetry_path)
+    if seed is not None:
+        np.random.seed(seed)
+
     if save_plot_dir is not None:
         os.makedirs(save_plot_dir, exist_ok=True)
-        if create_video:
-            tmp_dir = f'{save_plot_dir}/tmp_{save_plot_name}'
-            os.makedirs(tmp_dir, exist_ok=True)
-
-    # Set default movement steps for 4 and 8 neighbor types
-    x_step = np.array([-1, 0, 1, 0])  # Template arrays for random walk (4-neighbors)
-    y_step = np.array([0, -1, 0, 1])
-
-    if neighbor_type == NeighborType.EIGHT_NEIGHBORS:
-        dx = np.array([-1, 0, 1, 0, -1, 1, 1, -1])  # Template arrays for sticking (8 neighbors)
-        dy = np.array([0, -1, 0, 1, -1, -1, 1, 1])
-    elif neighbor_type == NeighborType.FOUR_NEIGHBORS:
-        dx = np.array([-1, 0, 1, 0])  # Template arrays for sticking (4 neighbors)
-        dy = np.array([0, -1, 0, 1])
-    elif neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-        # Even/odd row dependent neighbors for triangular lattice
-        dx_even = np.array([0, 1, 1, 0, -1, -1])
-        dy_even = np.array([-1, -1, 0, 1, 0, -1])
-        dx_odd = np.array([1, 1, 0, -1, -1, 0])
-        dy_odd = np.array([1, 0, 1, 1, 0, -1])
-
-    grid = np.zeros([n + 2, n + 2], dtype='int')  # Lattice array
-
-    x = np.zeros(n_walkers, dtype='int')  # Walker x-coordinate in nodal unit
-    y = np.zeros(n_walkers, dtype='int')  # Walker y-coordinate in nodal unit
-    status = np.ones(n_walkers, dtype='int')  # Walker status array: all mobile
-
-    # Add sticky points
-    for i, j in sticky_points:
-        grid[i, j] = 2  # Introduce sticky central node
-
-    # Generate walker positions
-    pos_x_y = set()
-    for i in range(0, n):
-        for j in range(0, n):
-            if grid[i][j] == 0:
-                pos_x_y.add((i, j))
-
-    # Place walkers using normal distribution if specified, else randomly
-    if normal_distribution is not None:
-        center = n // 2
-        for i in range(0, n_walkers):
-            while True:
-                # Generate normally distributed positions around center
-                x[i] = int(np.random.normal(center, normal_distribution)) % n
-                y[i] = int(np.random.normal(center, normal_distribution)) % n
-                if (x[i], y[i]) in pos_x_y:
-                    pos_x_y.remove((int(x[i]), int(y[i])))
-                    grid[x[i], y[i]] = 1
-                    break
-    else:
-        for i in range(0, n_walkers):  # Place walkers randomly
-            x[i], y[i] = random.choice(tuple(pos_x_y))
-            pos_x_y.remove((int(x[i]), int(y[i])))
-            grid[x[i], y[i]] = 1
-
-    # Initial plot
-    if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-        plot_hexagonal(grid, save_plot_name=f'{save_plot_name}_start', save_plot_dir=save_plot_dir)
-    else:
-        fig, ax = plt.subplots()
-        ax.imshow(grid, interpolation="nearest")  # Display aggregate as pixel image
-        fig.savefig(f'{save_plot_dir}\\{save_plot_name}_start.png')
-        plt.close(fig)
 
-    # Counters
-    iteration, n_glued = 0, 0
+    # Resume from a checkpoint of the same simulation if there is one
+    state = None
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path)
 
-    if create_video:
-        if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-            plot_hexagonal(grid, save_plot_name=save_plot_name, save_plot_dir=tmp_dir, iteration=0)
-        else:
-            fig, ax = plt.subplots()
-            ax.imshow(grid, interpolation="nearest")  # Display aggregate as pixel image
-            ax.set_title(f'{save_plot_name}')
-            fig.savefig(f'{tmp_dir}\\frame_{0}.png')
-            plt.close(fig)
-
-    while ((n_glued < n_walkers)
-           and (max_iterations is None or iteration < max_iterations)):
-        for i in range(0, n_walkers):  # Loop over walkers
-            if status[i] == 1:  # This walker is still mobile
-                if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-                    # Handle triangular movement based on row (even/odd)
-                    if x[i] % 2 == 0:  # Even row
-                        step_direction = np.random.choice(6)
-                        x_new = (x[i] + dx_even[step_direction]) % n
-                        y_new = (y[i] + dy_even[step_direction]) % n
-                    else:  # Odd row
-                        step_direction = np.random.choice(6)
-                        x_new = (x[i] + dx_odd[step_direction]) % n
-                        y_new = (y[i] + dy_odd[step_direction]) % n
-                else:
-                    # Handle random walk for 4 and 8 neighbors
-                    ii = np.random.choice([0, 1, 2, 3])  # Pick direction for 4-neighbors
-                    x_new = (x[i] + x_step[ii]) % n  # New position on lattice
-                    y_new = (y[i] + y_step[ii]) % n  # New position
-
-                if grid[x_new, y_new] != 2:
-                    grid[x_new, y_new] = 1  # Update lattice
-                    grid[x[i], y[i]] = 0  # Move walker
-                    x[i], y[i] = x_new, y_new
-
-                if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-                    # Sticky check for triangular lattice based on even/odd rows
-                    if x[i] % 2 == 0:  # Even row sticky check
-                        if 2 in grid[(x[i] + dx_even[:]) % n, (y[i] + dy_even[:]) % n]:
-                            grid[x[i], y[i]] = 2  # Stick the walker
-                            status[i] = 2
-                            n_glued += 1
-                    else:  # Odd row sticky check
-                        if 2 in grid[(x[i] + dx_odd[:]) % n, (y[i] + dy_odd[:]) % n]:
-                            grid[x[i], y[i]] = 2  # Stick the walker
-                            status[i] = 2
-                            n_glued += 1
-                else:
-                    # Sticky check for 4 and 8 neighbors
-                    if 2 in grid[(x[i] + dx[:]) % n, (y[i] + dy[:]) % n]:
-                        grid[x[i], y[i]] = 2  # Stick the walker
-                        status[i] = 2
-                        n_glued += 1
-
-        iteration += 1
+    # A cached run with the same inputs and RNG state returns its result without simulating
+    cache_key = video_key = None
+    video_path = f'{save_plot_dir}\\{save_plot_name}.mp4' if create_video else None
+    if cache is not None and state is None and metrics is None:
         if create_video:
-            if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-                plot_hexagonal(grid, save_plot_name=save_plot_name, save_plot_dir=tmp_dir, iteration=iteration)
-            else:
-                fig, ax = plt.subplots()
-                ax.set_title(f'{save_plot_name}')
-                ax.imshow(grid, interpolation="nearest")  # Display aggregate as pixel image
-                fig.savefig(f'{tmp_dir}\\frame_{iteration}.png')
-                plt.close(fig)
+            video_key = ResultCache.key(title=save_plot_name, stride=video_stride, backpressure=video_backpressure,
+                                        hexagonal=neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR)
+        cache_key = cache.key(version=ENGINE_VERSION, n=n, n_walkers=n_walkers, max_iterations=max_iterations,
+                              sticky_points=sticky_points, normal_distribution=normal_distribution,
+                              stencil=get_stencil(neighbor_type), engine=engine, boundary=boundary,
+                              tail_threshold=tail_threshold, snapshot_interval=snapshot_interval,
+                              rng=np.random.get_state())
+        entry = cache.get(cache_key)
+        if (entry is not None and (event_log is None or 'log_events' in entry)
+                and (not create_video or entry.get('video_key') == video_key)):
+            with telemetry.phase('placement'):
+                grid = allocate_grid(n, grid_path)
+                start = _restore_cache_entry(entry, grid, n, event_log, video_path)
+            if not headless:
+                with telemetry.phase('rendering'):
+                    _plot_grid(start, neighbor_type, save_plot_dir, f'{save_plot_name}_start')
+                    _plot_grid(grid, neighbor_type, save_plot_dir, f'{save_plot_name}_end')
+            summary = json.loads(entry['summary'])
+            record = telemetry.report(summary['iteration'], summary['n_glued'], summary['mobile'],
+                                      summary['walker_steps'], final=True)
+            telemetry.close()
+            if stats is not None:
+                stats.update(summary['stats'], phase_seconds=record['phases'], cached=True)
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile_path)
+            return grid
+
+    simulation = AggregationSimulation(n, n_walkers, sticky_points, normal_distribution, neighbor_type, engine,
+                                       boundary, tail_threshold, grid_path, metrics, event_log, snapshot_interval,
+                                       state, telemetry)
+    grid = simulation.grid
+    if state is not None:
+        if stats is not None:
+            stats['resumed_iteration'] = simulation.iteration  # Iteration the checkpoint continued from
+    else:
+        # Initial plot
+        if not headless:
+            with telemetry.phase('rendering'):
+                _plot_grid(grid, neighbor_type, save_plot_dir, f'{save_plot_name}_start')
+        if cache_key is not None:
+            start = pack_grid(grid, n)
+
+    video = None
+    if create_video:
+        # Frames are encoded on a background thread; a resumed run records its own segment
+        video_name = save_plot_name if state is None else f'{save_plot_name}_from_{simulation.iteration}'
+        video = AsyncVideoSink(f'{save_plot_dir}\\{video_name}.mp4', n, backpressure=video_backpressure,
+                               fps=60, stride=video_stride, title=save_plot_name,
+                               hexagonal=neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR)
+        telemetry.sources.append(video)
+        with telemetry.phase('rendering'):
+            video.write(grid, simulation.iteration)
+
+    last_checkpoint = time.perf_counter()
+    while not simulation.done and (max_iterations is None or simulation.iteration < max_iterations):
+        simulation.advance(max_iterations)
+        iteration = simulation.iteration
+        if video is not None:
+            with telemetry.phase('rendering'):
+                video.write(grid, iteration)
 
         if iteration % 100 == 0:
-            print("iteration {0}, glued walkers {1}.".format(iteration, n_glued))
+            telemetry.report(iteration, simulation.n_glued, simulation.mobile.size, simulation.walker_steps)
 
-    # Final plot
-    if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
-        plot_hexagonal(grid, save_plot_name=f'{save_plot_name}_end', save_plot_dir=save_plot_dir)
-    else:
-        fig, ax = plt.subplots()
-        ax.imshow(grid, interpolation="nearest")  # Display aggregate as pixel image
-        fig.savefig(f'{save_plot_dir}\\{save_plot_name}_end.png')
-        plt.close(fig)
+        if checkpoint_path is not None and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+            with telemetry.phase('checkpoint'):
+                checkpoint = simulation.checkpoint_state()
+                if simulation.log is not None:
+                    simulation.log.flush()  # The log must reach at least as far as the checkpoint
+                save_checkpoint(checkpoint_path, checkpoint)
+            last_checkpoint = time.perf_counter()
 
-    # Assemble video if requested
-    if create_video:
-        assemble_video(input_pattern=f'{tmp_dir}\\*.png',
-                       output_path=f'{save_plot_dir}\\{save_plot_name}.mp4',
-                       fps=60)
+    simulation.close()
+    run_stats = simulation.stats()  # Tail phase summary included
 
-    return grid
+    # Final plot
+    if not headless:
+        with telemetry.phase('rendering'):
+            _plot_grid(grid, neighbor_type, save_plot_dir, f'{save_plot_name}_end')
+
+    # Finish the video if requested
+    if video is not None:
+        video.close(grid)
+        run_stats.update(video_frames=video.frames, video_frames_dropped=video.dropped)
+    if stats is not None:
+        stats.update(run_stats)
+
+    iteration, n_glued, mobile, walker_steps = (simulation.iteration, simulation.n_glued, simulation.mobile.size,
+                                                simulation.walker_steps)
+    if cache_key is not None:
+        summary = {'iteration': iteration, 'n_glued': n_glued, 'mobile': mobile, 'walker_steps': walker_steps,
+                   'stats': run_stats}
+        cache.put(cache_key, _cache_entry(grid, n, start, summary, event_log, video_path, video_key))
+
+    record = telemetry.report(iteration, n_glued, mobile, walker_steps, final=True)
+    telemetry.close()
+    if stats is not None:
+        stats.update(phase_seconds=record['phases'])
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+    return simulation._grid
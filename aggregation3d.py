@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+
+from lattice import Boundary
+from lattice3d import CubicLattice, NeighborType3D
+from storage import BitVolume, sample_free_cells
+from telemetry import Telemetry
+
+
+def _place_walkers_3d(cluster: BitVolume, n, n_walkers, normal_distribution=None):
+    """
+    Draws distinct cells off the cluster for the walkers, as (x, y, z) coordinate arrays, uniformly or
+    around the centre when normal_distribution is given (see sample_free_cells).
+    """
+    if n_walkers > n ** 3 - cluster.count():
+        raise ValueError(f"{n_walkers} walkers do not fit on the free cells of an {n}^3 lattice.")
+
+    center = n // 2
+
+    def draw(size):
+        if normal_distribution is None:
+            return np.random.randint(n ** 3, size=size, dtype=np.int64)
+        # Truncate towards zero like int() and wrap around the lattice
+        x, y, z = (np.random.normal(center, normal_distribution, size).astype(np.int64) % n for _ in range(3))
+        return (x * n + y) * n + z
+
+    def occupied(cells):
+        x, rest = np.divmod(cells, n * n)
+        return cluster.get(x, *np.divmod(rest, n))
+
+    x, rest = np.divmod(sample_free_cells(n_walkers, draw, occupied), n * n)
+    return (x, *np.divmod(rest, n))
+
+
+def _batch_step_3d(lattice: CubicLattice, cluster: BitVolume, frontier: BitVolume, x, y, z, status, mobile,
+                   telemetry: Telemetry) -> int:
+    """
+    _batch_step for cubic lattices: moves every mobile walker at once and returns the number glued.
+    Moves onto the cluster are rejected, one walker moves into each claimed cell, and sticking is
+    synchronous. Walkers are not stored in the lattice, so only the cluster and frontier bits are kept.
+    """
+    if mobile.size == 0:
+        return 0
+
+    tx, ty, tz, crossed = lattice.step(x[mobile], y[mobile], z[mobile],
+                                       np.random.randint(lattice.n_moves, size=mobile.size))
+    if lattice.boundary == Boundary.ABSORBING and crossed.any():
+        status[mobile[crossed]] = 0
+
+    allowed = ~crossed
+    allowed[allowed] = ~cluster.get(tx[allowed], ty[allowed], tz[allowed])
+    movers = np.random.permutation(np.flatnonzero(allowed))
+    claims = lattice.index(tx[movers], ty[movers], tz[movers])
+    order = np.argsort(claims, kind='stable')  # Keeps the random order above, which decides who wins a cell
+    claims = claims[order]
+    movers = movers[order[np.r_[True, claims[1:] != claims[:-1]][:claims.size]]]
+
+    moved = mobile[movers]
+    x[moved], y[moved], z[moved] = tx[movers], ty[movers], tz[movers]
+    mobile = mobile[status[mobile] == 1]
+
+    with telemetry.phase('sticky'):
+        stuck = mobile[frontier.get(x[mobile], y[mobile], z[mobile])]
+        cluster.set(x[stuck], y[stuck], z[stuck])
+        status[stuck] = 2
+        lattice.mark_frontier(frontier, x[stuck], y[stuck], z[stuck])
+    return stuck.size
+
+
+def aggregate_3d(n: int,
+                 n_walkers: int,
+                 max_iterations: int = None,
+                 save_plot_dir: str = None,
+                 save_plot_name: str = None,
+                 sticky_points: list[tuple[int, int, int]] | np.ndarray = None,
+                 normal_distribution: float = None,
+                 neighbor_type: NeighborType3D = NeighborType3D.SIX_NEIGHBORS,
+                 boundary: Boundary = Boundary.PERIODIC,
+                 stats: dict = None,
+                 cluster_path: str = None,
+                 progress=None,
+                 telemetry_path: str = None) -> BitVolume:
+    """
+    Diffusion-limited aggregation on an n x n x n cubic lattice with the vectorized engine.
+
+    The cluster and its frontier are bit-packed (BitVolume), so a 512^3 lattice takes 32 MiB plus
+    the walker coordinates; `cluster_path` keeps the cluster bits in a .npy memory map. Walkers step to
+    the 6 face neighbours and stick under the 6-, 18- or 26-neighbour stencil. Progress is reported like
+    aggregate(). With save_plot_dir, the projection of the final cluster along z is saved.
+
+    Args:
+        sticky_points: Seed cells as (x, y, z) triples, the centre of the lattice by default.
+
+    Returns:
+        BitVolume: The cluster, ready for box_count_3d and mas_radius_3d.
+    """
+    lattice = CubicLattice(n, neighbor_type, boundary)
+    telemetry = Telemetry(progress, telemetry_path)
+
+    with telemetry.phase('placement'):
+        cluster = BitVolume(n, cluster_path)
+        frontier = BitVolume(n)  # Cells adjacent to the cluster under the sticking stencil
+        if sticky_points is None:
+            sticky_points = [(n // 2, n // 2, n // 2)]
+        seeds = np.asarray(sticky_points, dtype=np.int64).reshape(-1, 3)
+        cluster.set(*seeds.T)
+        lattice.mark_frontier(frontier, *seeds.T)
+        x, y, z = _place_walkers_3d(cluster, n, n_walkers, normal_distribution)
+
+    status = np.ones(n_walkers, dtype=np.uint8)  # 1 mobile, 2 glued, 0 absorbed
+    active = np.arange(n_walkers)  # Compacted index of mobile walkers
+    iteration, n_glued, walker_steps = 0, 0, 0
+
+    while active.size > 0 and (max_iterations is None or iteration < max_iterations):
+        with telemetry.phase('stepping'):
+            walker_steps += active.size
+            n_glued += _batch_step_3d(lattice, cluster, frontier, x, y, z, status, active, telemetry)
+        active = active[status[active] == 1]
+        iteration += 1
+
+        if iteration % 100 == 0:
+            telemetry.report(iteration, n_glued, active.size, walker_steps)
+
+    record = telemetry.report(iteration, n_glued, active.size, walker_steps, final=True)
+    telemetry.close()
+    if stats is not None:
+        stats.update(iterations=iteration, glued=n_glued, absorbed=int(np.count_nonzero(status == 0)),
+                     phase_seconds=record['phases'])
+
+    # Final plot: the cluster seen along z
+    if save_plot_dir is not None:
+        from plotting import plot_image  # Only runs that save plots load matplotlib
+        os.makedirs(save_plot_dir, exist_ok=True)
+        plot_image(cluster.projection(), f'{save_plot_dir}\\{save_plot_name}_end.png')
+
+    return cluster
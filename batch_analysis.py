@@ -0,0 +1,207 @@
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+from collections import deque
+
+import numpy as np
+
+from box_count import box_count
+from mas_radius import mas_radius
+from storage import PackedGrid
+
+COLUMNS = ('path', 'n', 'box_dimension', 'mass_dimension', 'r_gyration', 'box_sizes', 'box_counts', 'radii',
+           'masses', 'error')
+GRID_SUFFIXES = ('.npy', '.npz')
+
+
+def load_grid(path: str, border: int = 2):
+    """
+    Opens a saved lattice without reading it into memory and returns (grid, n).
+
+    .npy files (e.g. aggregate(grid_path=...)) are memory-mapped (n + border, n + border) arrays.
+    .npz files are read lazily: checkpoints and result cache entries give their packed bits as a
+    PackedGrid, other archives their 'grid' array, or their only array.
+    """
+    if path.endswith('.npy'):
+        grid = np.load(path, mmap_mode='r')
+        return grid, grid.shape[0] - border
+    with np.load(path) as data:
+        if 'cluster_bits' in data.files:
+            cluster = data['cluster_bits']
+            n = int(data['n']) if 'n' in data.files else cluster.shape[0]
+            return PackedGrid(n, cluster, data['walker_bits']), n
+        if 'grid' in data.files or len(data.files) == 1:
+            grid = data['grid' if 'grid' in data.files else data.files[0]]
+            return grid, grid.shape[0] - border
+    raise ValueError(f"No lattice found in {path}.")
+
+
+def measure_grid(path: str,
+                 occupied_value: int = 2,
+                 sizes: list[int] = None,
+                 offsets: int = 1,
+                 radii: list[int] = None,
+                 min_radius: int = 0,
+                 max_radius: int = None,
+                 samples: int = 10,
+                 centers: list[tuple[float, float]] = None,
+                 centroid: bool = False,
+                 border: int = 2) -> dict:
+    """
+    box_count and mas_radius of one saved lattice, as a row of the COLUMNS table.
+
+    The box and mass-radius options are those of box_count and mas_radius. max_radius defaults to
+    n // 6 and the centre to (n // 2, n // 2), as in the exercises; `centroid` uses the centroid of
+    the occupied nodes instead, and several `centers` average the masses. Errors go to the row's
+    error column instead of being raised, so one bad file does not stop a batch.
+    """
+    row = dict.fromkeys(COLUMNS)
+    row['path'] = path
+    try:
+        grid, n = load_grid(path, border)
+        row['n'] = n
+        _, scale, n_box, row['box_dimension'] = box_count(n, grid, occupied_value, sizes, offsets)
+        row['box_sizes'], row['box_counts'] = scale.astype(int).tolist(), n_box.tolist()
+        if centers is None and not centroid:
+            centers = [(n // 2, n // 2)]
+        row['radii'], row['masses'], row['mass_dimension'], row['r_gyration'] = mas_radius(
+            grid, n, None, None, min_radius, n // 6 if max_radius is None else max_radius, samples,
+            occupied_value, centers=centers, radii=radii, gyration=True)
+        row['radii'] = list(map(int, row['radii']))
+        row['box_dimension'], row['mass_dimension'] = float(row['box_dimension']), float(row['mass_dimension'])
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+    return row
+
+
+def _measure_chunk(paths: list[str], options: dict) -> list[dict]:
+    return [measure_grid(path, **options) for path in paths]
+
+
+def find_grids(directory: str, recursive: bool = False):
+    """Generator of the .npy and .npz files in the directory, without listing it all up front."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir() and recursive:
+                yield from find_grids(entry.path, recursive)
+            elif entry.is_file() and entry.name.endswith(GRID_SUFFIXES):
+                yield entry.path
+
+
+class ResultTable:
+    """
+    Rows written as they arrive, as CSV or, for a .jsonl path, as JSON lines. In CSV the list columns
+    (box sizes and counts, radii, masses) are space-separated values; JSON lines keeps them as lists.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = open(path, 'w', newline='')
+        self._csv = None
+        if not path.endswith('.jsonl'):
+            self._csv = csv.DictWriter(self._file, COLUMNS)
+            self._csv.writeheader()
+
+    def write(self, row: dict):
+        if self._csv is None:
+            self._file.write(json.dumps(row) + '\n')
+        else:
+            self._csv.writerow({key: ' '.join(map(str, value)) if isinstance(value, list) else value
+                                for key, value in row.items()})
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _chunks(paths, chunk_size: int):
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def measure_directory(directory: str,
+                      output_path: str,
+                      recursive: bool = False,
+                      max_workers: int = None,
+                      chunk_size: int = 16,
+                      report_every: int = 1000,
+                      **options) -> int:
+    """
+    Runs measure_grid on every lattice file in the directory and streams the rows to `output_path`
+    (see ResultTable), in completion order. Returns the number of rows written.
+
+    Files are handed to a process pool in chunks of `chunk_size`, and at most two chunks per worker
+    are in flight, so memory stays bounded however many files there are: the directory is scanned
+    lazily, each worker memory-maps one lattice at a time and rows are written as chunks finish.
+    max_workers=1 runs in this process. `options` are passed on to measure_grid.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = _chunks(find_grids(directory, recursive), chunk_size)
+    with ResultTable(output_path) as table:
+        def write_rows(rows):
+            for row in rows:
+                if row['error'] is not None:
+                    print(f"{row['path']}: {row['error']}")
+                table.write(row)
+                if table.rows % report_every == 0:
+                    print(f"{table.rows} grids measured.")
+
+        if max_workers == 1:
+            for chunk in chunks:
+                write_rows(_measure_chunk(chunk, options))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                running = deque()
+                for chunk in chunks:
+                    running.append(executor.submit(_measure_chunk, chunk, options))
+                    if len(running) >= 2 * max_workers:
+                        done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            running.remove(future)
+                            write_rows(future.result())
+                for future in concurrent.futures.as_completed(running):
+                    write_rows(future.result())
+        print(f"{table.rows} grids measured, results in {output_path}.")
+        return table.rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Box-counting and mass-radius analysis of a directory of saved grids.')
+    parser.add_argument('directory', help='Directory of .npy lattices, checkpoints or result cache entries.')
+    parser.add_argument('output_path', help='CSV file to write, or JSON lines for a .jsonl path.')
+    parser.add_argument('--recursive', action='store_true', help='Also scan subdirectories.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes, the CPU count by default.')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Files per pool task.')
+    parser.add_argument('--occupied-value', type=int, default=2, help='Grid value of the measured nodes.')
+    parser.add_argument('--border', type=int, default=2, help='Ghost rows and columns around the n x n lattice.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help='Box sizes, powers of two by default.')
+    parser.add_argument('--offsets', type=int, default=1, help='Box grid origins averaged per size.')
+    parser.add_argument('--radii', type=int, nargs='+', default=None, help='Mass-radius radii.')
+    parser.add_argument('--min-radius', type=int, default=0)
+    parser.add_argument('--max-radius', type=int, default=None, help='n // 6 by default.')
+    parser.add_argument('--samples', type=int, default=10, help='Radii between min and max radius.')
+    parser.add_argument('--center', type=float, nargs=2, action='append', default=None, metavar=('X', 'Y'),
+                        help='Mass-radius centre, the lattice centre by default; repeat to average several.')
+    parser.add_argument('--centroid', action='store_true', help='Measure around the centroid of the cluster.')
+    args = parser.parse_args()
+    measure_directory(args.directory, args.output_path, recursive=args.recursive, max_workers=args.workers,
+                      chunk_size=args.chunk_size, occupied_value=args.occupied_value, sizes=args.sizes,
+                      offsets=args.offsets, radii=args.radii, min_radius=args.min_radius,
+                      max_radius=args.max_radius, samples=args.samples,
+                      centers=[tuple(center) for center in args.center] if args.center else None,
+                      centroid=args.centroid, border=args.border)
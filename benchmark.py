@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from aggregation import AggregationSimulation, Boundary, Engine, NeighborType, aggregate
+from box_count import box_count
+from event_log import EventLogReader
+from mas_radius import mas_radius
+from plotting import plot_hexagonal
+from video_creator import assemble_video
+
+SIZES = (64, 128)
+DENSITIES = (0.02, 0.06)
+ENGINES = {'loop': dict(engine=Engine.LOOP), 'batch': dict(engine=Engine.BATCH)}
+REFERENCE = dict(engine=Engine.LOOP, tail_threshold=0)  # The original walker-at-a-time loop
+CANDIDATES = {'loop_tail': dict(engine=Engine.LOOP, tail_threshold=64), 'batch': dict(engine=Engine.BATCH)}
+
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def time_call(func, repeats: int = 3, seed: int = 0) -> dict:
+    """Runs func() `repeats` times from the same seed and returns its wall-clock times."""
+    times = []
+    for _ in range(repeats):
+        np.random.seed(seed)
+        start = time.perf_counter()
+        _quiet(func)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times),
+            'repeats': repeats}
+
+
+def _simulate(n, n_walkers, neighbor_type, seed, **kwargs):
+    # Headless, so the start and end plots are not timed with the engine
+    np.random.seed(seed)
+    return _quiet(aggregate, n, n_walkers, sticky_points=[(n // 2, n // 2)], neighbor_type=neighbor_type,
+                  headless=True, **kwargs)
+
+
+def bench_aggregate(sizes=SIZES, densities=DENSITIES, engines=ENGINES, repeats: int = 3) -> list[dict]:
+    """Times aggregate() for every NeighborType, engine, lattice size and walker density."""
+    results = []
+    for neighbor_type in NeighborType:
+        for name, options in engines.items():
+            for n in sizes:
+                for density in densities:
+                    n_walkers = round(n * n * density)
+                    timing = time_call(lambda: _simulate(n, n_walkers, neighbor_type, 0, **options),
+                                       repeats)
+                    results.append({'name': 'aggregate', 'neighbor_type': neighbor_type.name, 'engine': name,
+                                    'n': n, 'density': density, 'n_walkers': n_walkers, **timing})
+    return results
+
+
+def bench_analysis(work_dir, n: int = 256, repeats: int = 3) -> list[dict]:
+    """Times box_count, mas_radius, plot_hexagonal and assemble_video on representative inputs."""
+    grid = _simulate(n, round(n * n * 0.05), NeighborType.EIGHT_NEIGHBORS, 0, engine=Engine.BATCH)
+    hex_grid = _simulate(128, 800, NeighborType.SIX_NEIGHBORS_TRIANGULAR, 0, engine=Engine.BATCH)
+
+    frames_dir = os.path.join(work_dir, 'frames')
+    os.makedirs(frames_dir, exist_ok=True)
+    for i in range(60):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[:, :i * 10] = 255
+        cv2.imwrite(os.path.join(frames_dir, f'frame_{i}.png'), frame)
+
+    calls = {
+        'box_count': (dict(n=n), lambda: box_count(n, grid)),
+        'box_count_offsets': (dict(n=n, offsets=4), lambda: box_count(n, grid, offsets=4)),
+        'mas_radius': (dict(n=n, samples=10), lambda: mas_radius(grid, n, n // 2, n // 2, 0, n // 4, 10, 2)),
+        'mas_radius_dense': (dict(n=n, samples=n // 4), lambda: mas_radius(grid, n, n // 2, n // 2, 0, 0, 0, 2,
+                                                                            radii=list(range(n // 4)))),
+        'plot_hexagonal': (dict(n=128), lambda: plot_hexagonal(hex_grid, 'benchmark_hex', work_dir)),
+        'assemble_video': (dict(frames=60), lambda: assemble_video(os.path.join(frames_dir, '*.png'),
+                                                                   os.path.join(work_dir, 'benchmark.mp4'), 60)),
+    }
+    return [{'name': name, **parameters, **time_call(func, repeats)} for name, (parameters, func) in calls.items()]
+
+
+def _permutation_pvalue(a, b, statistic, permutations: int = 2000, seed: int = 0) -> float:
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([a, b])
+    observed = statistic(a, b)
+    count = 0
+    for _ in range(permutations):
+        rng.shuffle(pooled)
+        count += statistic(pooled[:a.size], pooled[a.size:]) >= observed
+    return (count + 1) / (permutations + 1)
+
+
+def _mean_difference(a, b):
+    return abs(a.mean() - b.mean())
+
+
+def _ks_distance(a, b):
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(np.sort(a), values, side='right') / a.size
+    cdf_b = np.searchsorted(np.sort(b), values, side='right') / b.size
+    return np.abs(cdf_a - cdf_b).max()
+
+
+def check_equivalence(n: int = 64, density: float = 0.08, seeds: int = 12,
+                      neighbor_types=tuple(NeighborType), candidates=CANDIDATES, alpha: float = 0.01) -> list[dict]:
+    """
+    Compares the box-counting dimension of every candidate engine with the reference loop over
+    independent seeds. Permutation tests on the mean and on the Kolmogorov-Smirnov distance of the two
+    samples give p-values; a candidate is consistent when both stay above alpha.
+    """
+    n_walkers = round(n * n * density)
+
+    def slopes(neighbor_type, options):
+        return np.array([box_count(n, _simulate(n, n_walkers, neighbor_type, seed, **options))[3]
+                         for seed in range(seeds)])
+
+    results = []
+    for neighbor_type in neighbor_types:
+        reference = slopes(neighbor_type, REFERENCE)
+        for name, options in candidates.items():
+            candidate = slopes(neighbor_type, options)
+            p_mean = _permutation_pvalue(reference, candidate, _mean_difference)
+            p_ks = _permutation_pvalue(reference, candidate, _ks_distance)
+            results.append({'name': 'equivalence', 'neighbor_type': neighbor_type.name, 'candidate': name,
+                            'n': n, 'n_walkers': n_walkers, 'seeds': seeds,
+                            'reference_mean': float(reference.mean()), 'reference_std': float(reference.std()),
+                            'candidate_mean': float(candidate.mean()), 'candidate_std': float(candidate.std()),
+                            'p_mean': p_mean, 'p_ks': p_ks, 'consistent': bool(min(p_mean, p_ks) > alpha)})
+    return results
+
+
+def check_replay(work_dir, n: int = 64, density: float = 0.08, snapshot_interval: int = 25, seeds: int = 3,
+                 engines=None, boundaries=(Boundary.PERIODIC, Boundary.ABSORBING)) -> list[dict]:
+    """
+    Runs every engine (the reference loop and the candidates by default) with an event log and
+    compares EventLogReader.grid_at() with the live grid at every iteration that has a walker snapshot.
+    A run replays exactly when no cell differs.
+    """
+    engines = {'loop': REFERENCE, **CANDIDATES} if engines is None else engines
+    n_walkers = round(n * n * density)
+    results = []
+    for boundary in boundaries:
+        for name, options in engines.items():
+            compared, mismatched = 0, 0
+            for seed in range(seeds):
+                log_path = os.path.join(work_dir, f'replay_{boundary.name}_{name}_{seed}')
+                np.random.seed(seed)
+                simulation = AggregationSimulation(n, n_walkers, [(n // 2, n // 2)], boundary=boundary,
+                                                   event_log=log_path, snapshot_interval=snapshot_interval,
+                                                   **options)
+                live = {snapshot.iteration: snapshot.grid.copy() for snapshot in simulation.stream(snapshot_interval)
+                        if snapshot.iteration % snapshot_interval == 0}  # Skipped tail iterations have no snapshot
+                simulation.close()
+                log = EventLogReader(log_path)
+                for iteration, grid in live.items():
+                    compared += 1
+                    mismatched += int(np.count_nonzero(log.grid_at(iteration) != grid))
+            results.append({'name': 'replay', 'boundary': boundary.name, 'engine': name, 'n': n,
+                            'n_walkers': n_walkers, 'seeds': seeds, 'iterations': compared,
+                            'mismatched_cells': mismatched, 'exact': mismatched == 0})
+    return results
+
+
+def run_benchmarks(output_path: str = 'benchmark.json', repeats: int = 3, sizes=SIZES, densities=DENSITIES,
+                   seeds: int = 12, equivalence: bool = True) -> dict:
+    """Runs every benchmark in a temporary directory and writes the results as JSON."""
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+              'numpy': np.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+    with tempfile.TemporaryDirectory() as work_dir:
+        report['aggregate'] = bench_aggregate(sizes, densities, repeats=repeats)
+        report['analysis'] = bench_analysis(work_dir, repeats=repeats)
+        report['replay'] = check_replay(work_dir)
+        if equivalence:
+            report['equivalence'] = check_equivalence(seeds=seeds)
+
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    for record in report['aggregate'] + report['analysis']:
+        label = ' '.join(str(value) for key, value in record.items()
+                         if key not in ('min', 'median', 'mean', 'repeats'))
+        print(f"{label}: {record['median']:.3f}s")
+    for record in report['replay']:
+        print("replay {0} {1}: {2} iterations, {3} mismatched cells".format(
+            record['boundary'], record['engine'], record['iterations'], record['mismatched_cells']))
+    for record in report.get('equivalence', []):
+        print("{0} {1}: reference {2:.3f}, candidate {3:.3f}, p={4:.3f}/{5:.3f}, {6}".format(
+            record['neighbor_type'], record['candidate'], record['reference_mean'], record['candidate_mean'],
+            record['p_mean'], record['p_ks'], 'consistent' if record['consistent'] else 'INCONSISTENT'))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the simulation and analysis hot paths.')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file for the results.')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--densities', type=float, nargs='+', default=list(DENSITIES))
+    parser.add_argument('--seeds', type=int, default=12, help='Runs per engine in the equivalence check.')
+    parser.add_argument('--no-equivalence', action='store_true')
+    args = parser.parse_args()
+    run_benchmarks(args.output, args.repeats, args.sizes, args.densities, args.seeds, not args.no_equivalence)
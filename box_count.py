@@ -1,34 +1,111 @@
+import math
+
 import numpy as np
-from matplotlib import pyplot as plt
 
+from storage import BitVolume, occupied_plane
 
-def box_count(n, grid, occ_val=2):
-    # Input is 2D array "grid", of size nxn; value = 2 means occupied node
-    n_scales = 1  # Calculate number of scales
 
-    while (2 ** n_scales < n) and (n_scales < 100):
-        n_scales += 1
+def _pyramid_counts(occupied, n_scales):
+    # Level k is the OR-pool of level k - 1 over 2 x 2 blocks, so its cells are the boxes of size 2^k
+    n_box = np.zeros(n_scales)
+    level = occupied
+    for iscale in range(0, n_scales):
+        m = level.shape[0] // 2  # Only whole blocks are counted
+        level = (level[0:2 * m:2, 0:2 * m:2] | level[1:2 * m:2, 0:2 * m:2]
+                 | level[0:2 * m:2, 1:2 * m:2] | level[1:2 * m:2, 1:2 * m:2])
+        n_box[iscale] = np.count_nonzero(level)
+    return n_box
+
+
+POOL_MAX_SIZE = 4  # Box sizes up to this are OR-pooled from the plane; larger ones use the summed-area table
+
+
+def _box_origins(n, block_size, offsets):
+    # Grid origins shifted along the diagonal by equal fractions of the box size
+    origins = {round(k * block_size / offsets) for k in range(offsets)}
+    return sorted(origin for origin in origins if origin + block_size <= n)
+
+
+def _pool(plane, step, dtype=bool):
+    # Reduces the whole step x step blocks of a plane from strided slices, rows first: OR for bool, else sums
+    if step == 1:
+        return plane
+    m = plane.shape[0] // step
+    plane = plane[:m * step, :m * step]
+    rows = np.add(plane[0::step], plane[1::step], dtype=dtype)  # Logical or on bool
+    for k in range(2, step):
+        rows += plane[k::step]
+    pooled = rows[:, 0::step] + rows[:, 1::step]
+    for k in range(2, step):
+        pooled += rows[:, k::step]
+    return pooled
+
+
+def _summed_area_table(occupied, cell=1):
+    # table[i, j] is the number of occupied nodes in occupied[:i * cell, :j * cell]
+    n = occupied.shape[0]
+    dtype = np.int32 if n * n < 2 ** 31 else np.int64
+    plane = _pool(occupied, cell, dtype) if cell > 1 else occupied
+    table = np.zeros((plane.shape[0] + 1, plane.shape[1] + 1), dtype=dtype)
+    np.cumsum(plane, axis=1, dtype=dtype, out=table[1:, 1:])
+    for i in range(1, table.shape[0]):  # One vector add per row: NumPy's cumsum along axis 0 is several times slower
+        np.add(table[i], table[i - 1], out=table[i])
+    return table
+
+
+def _table_counts(table, cell, n, block_size, origins):
+    # Nonzero block sums from the corners of the boxes; cell divides the box size and every origin
+    counts = []
+    step = block_size // cell
+    for origin in origins:
+        start = origin // cell
+        end = start + step * ((n - origin) // block_size) + 1  # Only whole blocks are counted
+        corners = table[start:end:step, start:end:step]  # Strided view, no copy
+        rows = corners[1:] - corners[:-1]  # Running totals along each row of boxes
+        counts.append(np.count_nonzero(rows[:, 1:] != rows[:, :-1]))
+    return counts
 
-    scale = np.zeros(n_scales)  # Will hold all box size values
-    n_box = np.zeros(n_scales)  # Will hold the boxcount
 
-    for iscale in range(0, n_scales):  # Loop over allowed scales
-        block_size = 2 ** (iscale + 1)  # Block size for this scale
-        n_block = n // block_size  # Number of blocks for this scale
-        n_box[iscale] = 0
+def box_count(n, grid, occ_val=2, sizes=None, offsets=1):
+    """
+    Box-counting estimate of the fractal dimension of the nodes equal to occ_val in grid[:n, :n].
+    `grid` may be a lattice array, a memory map or a PackedGrid; only a bool plane is materialized.
 
-        for i in range(0, n_block):  # Loop over first dimension
-            i1 = block_size * i  # i-range of this block
-            i2 = block_size * (i + 1)
+    By default boxes have sizes 2, 4, ..., up to n and are counted on a reduction pyramid. Arbitrary
+    box sizes (`sizes`) or several grid origins per size (`offsets`) are counted by OR-pooling strided
+    slices (boxes up to POOL_MAX_SIZE) or on a summed-area table built over the largest cells that
+    tile every other box, and n_box is then the average count over the origins.
 
-            for j in range(0, n_block):  # Loop over second dimension
-                j1 = block_size * j  # j-range of this block
-                j2 = block_size * (j + 1)
+    Returns:
+        tuple: (n_scales, scale, n_box, slope) with the box sizes, the box counts and the fitted slope.
+    """
+    occupied = occupied_plane(grid, n, occ_val)  # Value = 2 means occupied node
 
-                if occ_val in grid[i1:i2, j1:j2]:  # At least 1 occupied node
-                    n_box[iscale] += 1  # Increment box count
+    if sizes is None and offsets == 1:
+        n_scales = 1  # Calculate number of scales
 
-        scale[iscale] = block_size
+        while (2 ** n_scales < n) and (n_scales < 100):
+            n_scales += 1
+
+        scale = 2.0 ** np.arange(1, n_scales + 1)  # Will hold all box size values
+        n_box = _pyramid_counts(occupied, n_scales)  # Will hold the boxcount
+    else:
+        if sizes is None:
+            sizes = [2 ** k for k in range(1, n.bit_length()) if 2 ** k <= n]
+        scale = np.array(sorted(set(int(size) for size in sizes if 1 <= size <= n)), dtype=float)
+        n_scales = scale.size
+        origins = {int(size): _box_origins(n, int(size), offsets) for size in scale}
+        # The table only needs cells dividing every larger box size and origin, so it is built over blocks
+        large = [value for size in origins if size > POOL_MAX_SIZE for value in (size, *origins[size])]
+        cell = math.gcd(*large)
+        table = _summed_area_table(occupied, cell) if large else None
+        n_box = np.zeros(n_scales)
+        for iscale, size in enumerate(origins):
+            if size <= POOL_MAX_SIZE:
+                counts = [np.count_nonzero(_pool(occupied[origin:, origin:], size)) for origin in origins[size]]
+            else:
+                counts = _table_counts(table, cell, n, size, origins[size])
+            n_box[iscale] = np.mean(counts)  # Average over the origins
 
     # Perform linear regression in log-log space to find slope
     log_scale = np.log(1.0 / scale)
@@ -45,3 +122,54 @@ def box_count(n, grid, occ_val=2):
     #plt.show()
 
     return n_scales, scale, n_box, slope
+
+
+def _pool_3d(level):
+    # OR-pool over 2 x 2 x 2 blocks, one axis at a time; only whole blocks are kept
+    m = level.shape[0] // 2
+    level = level[0:2 * m:2] | level[1:2 * m:2]
+    level = level[:, 0:2 * m:2] | level[:, 1:2 * m:2]
+    return level[:, :, 0:2 * m:2] | level[:, :, 1:2 * m:2]
+
+
+def _packed_pool_3d(volume: BitVolume, slabs_per_chunk: int = 64):
+    # First pyramid level straight from the packed bits: x and y pairs are OR-ed byte-wise, and the
+    # z pair (2k, 2k + 1) of every byte lands on bit 2k
+    m = volume.n // 2
+    level = np.zeros((m, m, m), dtype=bool)
+    for start in range(0, 2 * m, 2 * slabs_per_chunk):
+        stop = min(start + 2 * slabs_per_chunk, 2 * m)
+        bits = volume.bits[start:stop:2, :2 * m] | volume.bits[start + 1:stop:2, :2 * m]
+        bits = bits[:, 0::2] | bits[:, 1::2]
+        bits = (bits | (bits >> 1)) & 0x55
+        level[start // 2:stop // 2] = np.unpackbits(bits, axis=2, count=2 * m, bitorder='little')[:, :, 0::2]
+    return level
+
+
+def box_count_3d(n, volume, occ_val=2):
+    """
+    Box-counting estimate of the fractal dimension of a cubic lattice, with boxes of sizes 2, 4, ...,
+    up to n (or the largest power of two below it) counted on a reduction pyramid. `volume` is a
+    BitVolume (the cluster of aggregate_3d) or an (n, n, n) array, whose nodes equal to occ_val are
+    occupied. A BitVolume is pooled straight from its packed bits, so a 512^3 lattice needs about 50 MB.
+
+    Returns:
+        tuple: (n_scales, scale, n_box, slope) with the box sizes, the box counts and the fitted slope.
+    """
+    n_scales = 1  # Box sizes up to the largest power of two that fits in the lattice
+    while 2 ** (n_scales + 1) <= n:
+        n_scales += 1
+    scale = 2.0 ** np.arange(1, n_scales + 1)
+
+    if isinstance(volume, BitVolume):
+        level = _packed_pool_3d(volume)
+    else:
+        level = _pool_3d(np.asarray(volume[:n, :n, :n]) == occ_val)
+    n_box = np.zeros(n_scales)
+    n_box[0] = np.count_nonzero(level)
+    for iscale in range(1, n_scales):
+        level = _pool_3d(level)
+        n_box[iscale] = np.count_nonzero(level)
+
+    slope, intercept = np.polyfit(np.log(1.0 / scale), np.log(n_box), 1)
+    return n_scales, scale, n_box, slope
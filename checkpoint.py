@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """
+    Writes a dict of arrays and scalars to an uncompressed .npz file atomically: the data goes to a
+    temporary file next to `path`, which then replaces it in one rename, so a crash mid-write leaves
+    the previous checkpoint intact.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:  # A file object keeps np.savez from appending .npz
+        np.savez(f, **state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """Reads a checkpoint written by save_checkpoint; 0-d arrays come back as Python scalars."""
+    with np.load(path) as data:
+        return {key: data[key].item() if data[key].ndim == 0 else data[key] for key in data.files}
+
+
+def rng_state() -> dict:
+    """State of NumPy's global random generator as checkpoint entries."""
+    _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return {'rng_keys': keys, 'rng_pos': pos, 'rng_has_gauss': has_gauss, 'rng_gauss': cached_gaussian}
+
+
+def set_rng_state(state: dict) -> None:
+    """Restores NumPy's global random generator from checkpoint entries."""
+    np.random.set_state(('MT19937', state['rng_keys'], state['rng_pos'],
+                         state['rng_has_gauss'], state['rng_gauss']))
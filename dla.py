@@ -0,0 +1,184 @@
+import math
+import os
+
+import numpy as np
+
+from lattice import NeighborType, get_stencil
+from storage import allocate_grid
+from telemetry import Telemetry
+
+RANDOM_BLOCK = 4096  # Uniform draws taken from np.random at a time
+
+
+def witten_sander(n: int,
+                  n_particles: int,
+                  sticky_points: list[tuple[int, int]] | np.ndarray = None,
+                  neighbor_type: NeighborType = NeighborType.EIGHT_NEIGHBORS,
+                  launch_margin: int = 5,
+                  kill_factor: float = 3.0,
+                  min_jump: int = 3,
+                  save_plot_dir: str = None,
+                  save_plot_name: str = None,
+                  seed: int = None,
+                  stats: dict = None,
+                  progress=None,
+                  telemetry_path: str = None) -> np.ndarray:
+    """
+    Classic Witten-Sander DLA: walkers are released one at a time from a circle just outside the
+    cluster, killed past the kill radius and stuck with the NeighborType sticking rules.
+
+    Far from the cluster a walker jumps to a random point on a circle that is known to be free:
+    outside the cluster's bounding circle the radius comes from the distance to that circle, closer in
+    it comes from a pyramid of coarse occupancy blocks (OR-pooled cluster and frontier cells).
+
+    Args:
+        n (int): Lattice size; the cluster grows from the seeds until n_particles stick or it
+            reaches the lattice edge.
+        n_particles (int): Number of particles to add to the seeds.
+        sticky_points (list | np.ndarray): Seed cells as (i, j) pairs or a boolean mask, defaults to
+            the lattice centre.
+        neighbor_type (NeighborType): Sticking (and, for the triangular lattice, moving) stencil.
+        launch_margin (int): Distance between the cluster's max radius and the launch circle.
+        kill_factor (float): Kill radius as a multiple of the launch radius.
+        min_jump (int): Shortest jump worth taking instead of single steps.
+        save_plot_dir (str): Directory for the final plot, if any.
+        save_plot_name (str): Name of the final plot.
+        seed (int): Seeds np.random first. Draws come from np.random in blocks, so np.random.seed()
+            makes runs reproducible as with aggregate().
+        stats (dict): Receives the particles stuck, walkers launched and killed, max radius, walker
+            steps (jumps included), whether the cluster reached the lattice edge and the phase seconds.
+        progress (callable): Progress callback as in aggregate(), called every 1000 particles with
+            the walkers launched as the iteration; `telemetry_path` appends the records to a file.
+
+    Returns:
+        np.ndarray: (n + 2, n + 2) grid with value 2 on cluster cells, like aggregate().
+    """
+    move_dx, move_dy, stick_dx, stick_dy = get_stencil(neighbor_type)
+    moves = [list(zip(move_dx[p].tolist(), move_dy[p].tolist())) for p in (0, 1)]
+    n_moves = len(moves[0])
+    # Cells q of parity p see c when q + stick[p] == c, so the frontier of c is c - stick[p]
+    reverse = [list(zip((-stick_dx[p]).tolist(), (-stick_dy[p]).tolist())) for p in (0, 1)]
+
+    telemetry = Telemetry(progress, telemetry_path)
+    grid = allocate_grid(n)
+    cluster = bytearray(n * n)
+    frontier = bytearray(n * n)
+
+    # Occupancy pyramid: level k holds one flag per 2^k x 2^k block, padded by one block on each side
+    levels = []
+    k = 2
+    while (1 << k) <= n // 4:
+        stride = (n >> k) + 3
+        levels.append((k, stride, bytearray(stride * stride)))
+        k += 1
+
+    def block(i, j):
+        for lk, lstride, lvl in levels:
+            lvl[((i >> lk) + 1) * lstride + (j >> lk) + 1] = 1
+
+    def stick(i, j):
+        cluster[i * n + j] = 1
+        grid[i, j] = 2
+        block(i, j)
+        for p in (0, 1):
+            for dx, dy in reverse[p]:
+                qi, qj = i + dx, j + dy
+                if qi % 2 == p and 0 <= qi < n and 0 <= qj < n:
+                    frontier[qi * n + qj] = 1
+                    block(qi, qj)
+
+    def free_radius(i, j):
+        # Largest 2^k - 1 such that the 3x3 blocks of level k around (i, j) are empty
+        radius = 0
+        for lk, lstride, lvl in levels:
+            b = ((i >> lk) + 1) * lstride + (j >> lk) + 1
+            if (lvl[b - lstride - 1] or lvl[b - lstride] or lvl[b - lstride + 1]
+                    or lvl[b - 1] or lvl[b] or lvl[b + 1]
+                    or lvl[b + lstride - 1] or lvl[b + lstride] or lvl[b + lstride + 1]):
+                break
+            radius = (1 << lk) - 1
+        return radius
+
+    with telemetry.phase('placement'):
+        if sticky_points is None:
+            sticky_points = [(n // 2, n // 2)]
+        elif isinstance(sticky_points, np.ndarray) and sticky_points.dtype == bool:
+            sticky_points = [(i, j) for i, j in np.argwhere(sticky_points[:n, :n]).tolist()]
+        for i, j in sticky_points:
+            stick(i, j)
+    center_x = sum(i for i, _ in sticky_points) / len(sticky_points)
+    center_y = sum(j for _, j in sticky_points) / len(sticky_points)
+    r_max = max(math.hypot(i - center_x, j - center_y) for i, j in sticky_points)
+    edge = min(center_x, center_y, n - 1 - center_x, n - 1 - center_y) - 2
+
+    if seed is not None:
+        np.random.seed(seed)
+    draws = []
+
+    def rand():
+        # Uniform draw from np.random, refilled a block at a time: one NumPy call per draw is slow
+        if not draws:
+            draws.extend(np.random.random(RANDOM_BLOCK).tolist())
+        return draws.pop()
+
+    two_pi = 2 * math.pi
+    n_stuck, launched, walker_steps = 0, 0, 0
+    edge_reached = False
+    while n_stuck < n_particles:
+        r_launch = r_max + launch_margin
+        r_kill = min(kill_factor * r_launch, edge)
+        if r_kill <= r_launch + 1:
+            edge_reached = True  # No room left for a kill circle outside the launch circle
+            break
+        r_kill2 = r_kill * r_kill
+
+        with telemetry.phase('stepping'):
+            # Release a walker from the launch circle
+            launched += 1
+            angle = two_pi * rand()
+            i = int(round(center_x + r_launch * math.cos(angle)))
+            j = int(round(center_y + r_launch * math.sin(angle)))
+            while True:
+                walker_steps += 1
+                d2 = (i - center_x) ** 2 + (j - center_y) ** 2
+                if d2 > r_kill2:
+                    break  # Killed; a fresh walker is launched
+
+                if frontier[i * n + j]:
+                    stick(i, j)
+                    n_stuck += 1
+                    r_max = max(r_max, math.sqrt(d2))
+                    break
+
+                # Long jump when the walker is known to be far from the cluster
+                jump = math.sqrt(d2) - r_max - 3
+                if jump < min_jump:
+                    jump = free_radius(i, j)
+                if jump >= min_jump:
+                    angle = two_pi * rand()
+                    i = int(round(i + jump * math.cos(angle)))
+                    j = int(round(j + jump * math.sin(angle)))
+                    continue
+
+                dx, dy = moves[i % 2][int(rand() * n_moves)]
+                if not cluster[(i + dx) * n + j + dy]:  # Moves onto the cluster are rejected
+                    i, j = i + dx, j + dy
+
+        if n_stuck % 1000 == 0 and d2 <= r_kill2:  # Every 1000th particle stuck, once its phase has closed
+            telemetry.report(launched, n_stuck, 0, walker_steps)
+
+    if save_plot_dir is not None:
+        from plotting import plot_hexagonal, plot_image  # Only runs that save plots load matplotlib
+        os.makedirs(save_plot_dir, exist_ok=True)
+        with telemetry.phase('rendering'):
+            if neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR:
+                plot_hexagonal(grid, save_plot_name=f'{save_plot_name}_end', save_plot_dir=save_plot_dir)
+            else:
+                plot_image(grid, os.path.join(save_plot_dir, f'{save_plot_name}_end.png'))
+
+    record = telemetry.report(launched, n_stuck, 0, walker_steps, final=True)
+    telemetry.close()
+    if stats is not None:
+        stats.update(particles=n_stuck, launched=launched, killed=launched - n_stuck, max_radius=r_max,
+                     walker_steps=walker_steps, edge_reached=edge_reached, phase_seconds=record['phases'])
+    return grid
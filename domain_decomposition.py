@@ -0,0 +1,279 @@
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from lattice import Boundary, Lattice, NeighborType, Stencil
+from storage import allocate_grid, place_walkers
+from telemetry import Telemetry
+
+UP, DOWN = 0, 1  # Outbox directions: towards the strip above (lower rows) and below (higher rows)
+
+
+class _SharedArrays:
+    """
+    NumPy arrays in named shared memory blocks. The parent creates them; workers attach with the
+    picklable `specs` (name, shape, dtype per array). Only the creator unlinks the blocks.
+    """
+
+    def __init__(self, specs: dict = None, **arrays):
+        self._blocks = []
+        self.arrays = {}
+        self.owner = specs is None
+        if specs is None:
+            specs = {}
+            for key, (shape, dtype) in arrays.items():
+                block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+                specs[key] = (block.name, shape, np.dtype(dtype).str)
+                self._blocks.append(block)
+                self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                self.arrays[key].fill(0)
+        else:
+            for key, (name, shape, dtype) in specs.items():
+                block = shared_memory.SharedMemory(name=name)
+                self._blocks.append(block)
+                self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.specs = specs
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays.clear()  # Views must go before their buffers
+        for block in self._blocks:
+            block.close()
+            if self.owner:
+                block.unlink()
+        self._blocks.clear()
+
+
+def strip_bounds(n: int, n_workers: int) -> np.ndarray:
+    """First row of each worker's strip, plus n: rows [bounds[k], bounds[k + 1]) belong to worker k."""
+    return np.linspace(0, n, n_workers + 1).astype(int)
+
+
+def _record(iteration, totals) -> tuple:
+    # Telemetry.report() arguments from the per-strip totals
+    mobile, glued, walker_steps = totals.sum(axis=0).tolist()
+    return iteration, glued, mobile, walker_steps
+
+
+def _strip_worker(k, specs, n, stencil, boundary, bounds, reach, n_walkers, max_iterations, seed, barrier, records):
+    """
+    Steps the walkers in rows [bounds[k], bounds[k + 1]) of the shared lattice, in lockstep with the
+    other strips. Each iteration has three phases separated by barriers:
+
+    1. Move: walkers draw their moves; moves onto the cluster are rejected and only one walker moves
+       into each claimed cell. Walkers crossing into a neighbouring strip always move (incoming walkers
+       take precedence) and are handed off through this worker's outbox for the border they cross;
+       strips are at least as high as the stencil's row `reach`, so they land in an adjacent strip.
+    2. Settle: local moves onto cells taken by incoming walkers are rejected, the incoming walkers join
+       this strip, and walkers on the frontier stick (the frontier is read-only in this phase, so
+       sticking is synchronous as in _batch_step). Cluster cells are written in the worker's own rows.
+    3. Frontier: the new cluster cells mark the frontier, which may spill into the halo rows of the
+       neighbouring strips; every mark writes True, so concurrent marks commute.
+
+    Every decision depends only on the lattice at the last barrier and on the worker's own seeded
+    RNG, so a run is reproducible for a given seed and number of workers.
+    """
+    shared = _SharedArrays(specs)
+    try:
+        np.random.seed(np.random.SeedSequence([seed, k]).generate_state(1)[0])
+        lattice = Lattice(n, stencil, boundary)
+        cells, frontier = shared['grid'].reshape(-1), shared['frontier']
+        pos, status = shared['pos'], shared['status']
+        outbox, box_counts, totals, seconds = shared['outbox'], shared['box_counts'], shared['totals'], shared['seconds']
+        n_workers = bounds.size - 1
+        lo, hi = bounds[k] * lattice.width, bounds[k + 1] * lattice.width  # Flat index range of the strip
+        above, below = (k - 1) % n_workers, (k + 1) % n_workers
+
+        row = pos // lattice.width
+        active = np.flatnonzero((status == 1) & (row >= bounds[k]) & (row < bounds[k + 1]))  # Walkers of this strip
+        del row
+        totals[k] = (active.size, 0, 0)
+        iteration = 0
+        busy = time.perf_counter()
+        barrier.wait()
+
+        while totals[:, 0].sum() > 0 and (max_iterations is None or iteration < max_iterations):
+            started = time.perf_counter()
+
+            # 1. Move
+            steps = active.size
+            cell = pos[active]
+            target = lattice.step(cell, np.random.randint(lattice.n_moves, size=active.size))
+            crossed = lattice.is_ghost(target)
+            if boundary == Boundary.ABSORBING and crossed.any():
+                status[active[crossed]] = 0
+            movers = np.random.permutation(np.flatnonzero(~crossed & (cells[target] != 2)))
+            _, first = np.unique(target[movers], return_index=True)
+            movers = movers[first]
+            leaving = (target[movers] < lo) | (target[movers] >= hi)
+            # Border each mover crosses, which bounds each outbox by the `reach` rows past it; with two
+            # strips the strip above is also the one below, so the strip it lands in would not do
+            down = (target[movers] // lattice.width - bounds[k + 1]) % n < reach
+            for direction, hand_off in ((UP, leaving & ~down), (DOWN, leaving & down)):
+                out = movers[hand_off]
+                pos[active[out]] = target[out]
+                outbox[k, direction, :out.size] = active[out]
+                box_counts[k, direction] = out.size
+            local = movers[~leaving]
+            gone = np.zeros(active.size, dtype=bool)
+            gone[movers[leaving]] = True
+            seconds[k, 0] += time.perf_counter() - started
+            barrier.wait()
+
+            # 2. Settle
+            started = time.perf_counter()
+            incoming = np.zeros(0, dtype=active.dtype)
+            if n_workers > 1:
+                incoming = np.concatenate([outbox[above, DOWN, :box_counts[above, DOWN]],
+                                           outbox[below, UP, :box_counts[below, UP]]])
+            if incoming.size:
+                local = local[~np.isin(target[local], pos[incoming])]
+            pos[active[local]] = target[local]
+            active = np.concatenate([active[~gone], incoming])
+            active = active[status[active] == 1]
+            on_frontier = frontier[pos[active]]
+            stuck = active[on_frontier]
+            cells[pos[stuck]] = 2
+            status[stuck] = 2
+            active = active[~on_frontier]
+            totals[k] += (active.size - totals[k, 0], stuck.size, steps)
+            seconds[k, 0] += time.perf_counter() - started
+            barrier.wait()
+
+            # 3. Frontier
+            started = time.perf_counter()
+            lattice.mark_frontier(frontier, pos[stuck])
+            iteration += 1
+            if k == 0 and iteration % 100 == 0:
+                records.put(_record(iteration, totals))
+            seconds[k, 0] += time.perf_counter() - started
+            barrier.wait()
+
+        seconds[k, 1] = time.perf_counter() - busy - seconds[k, 0]  # Waiting at barriers
+        if k == 0:
+            records.put(_record(iteration, totals))
+    except BaseException:
+        barrier.abort()  # Release the other strips instead of leaving them at the barrier
+        raise
+    finally:
+        if k == 0:
+            records.put(None)
+        shared.close()
+
+
+def aggregate_parallel(n: int,
+                       n_walkers: int,
+                       n_workers: int = None,
+                       max_iterations: int = None,
+                       save_plot_dir: str = None,
+                       save_plot_name: str = None,
+                       sticky_points: list[tuple[int, int]] | np.ndarray = None,
+                       normal_distribution: float = None,
+                       neighbor_type: NeighborType | Stencil = NeighborType.EIGHT_NEIGHBORS,
+                       boundary: Boundary = Boundary.PERIODIC,
+                       stats: dict = None,
+                       progress=None,
+                       telemetry_path: str = None) -> np.ndarray:
+    """
+    Runs one aggregate() simulation (BATCH engine rules) across `n_workers` processes, the CPU count
+    by default, and returns the (n + 2, n + 2) grid.
+
+    The lattice, frontier and walker arrays live in multiprocessing.shared_memory. The rows are split
+    into horizontal strips, one per worker process, and each worker steps the walkers in its strip.
+    Strips read their neighbours' halo rows straight from the shared lattice; walkers crossing a strip
+    border are handed off through per-worker outboxes. The workers synchronize three times per
+    iteration (see _strip_worker), and a walker entering a strip wins its cell over the strip's own
+    walkers. Worker RNGs are seeded from np.random, so with np.random.seed() a run is reproducible for
+    a given number of workers; runs are statistically equivalent to the single-process BATCH engine.
+
+    Progress is reported like aggregate(); the workers' compute and barrier-wait seconds go to `stats`
+    as worker_seconds and wait_seconds. Large lattices (4096^2 and up) are where the strips pay off:
+    each iteration costs three barriers, which small lattices do not amortize.
+    """
+    lattice = Lattice.from_neighbor_type(n, neighbor_type, boundary)
+    reach = max(1, int(np.abs(lattice.stencil.move_dx).max()))  # Rows a single move can cross
+    n_workers = os.cpu_count() if n_workers is None else n_workers
+    n_workers = max(1, min(n_workers, n // max(2, reach)))  # Strips at least `reach` rows high: one border per move
+    telemetry = Telemetry(progress, telemetry_path)
+
+    with telemetry.phase('placement'):
+        shared = _SharedArrays(grid=((n + 2, n + 2), np.uint8), frontier=((lattice.size,), bool),
+                               pos=((n_walkers,), np.int64), status=((n_walkers,), np.uint8),
+                               outbox=((n_workers, 2, reach * n), np.int64), box_counts=((n_workers, 2), np.int64),
+                               totals=((n_workers, 3), np.int64),  # Mobile, glued, walker steps
+                               seconds=((n_workers, 2), np.float64))  # Compute, barrier wait
+    try:
+        with telemetry.phase('placement'):
+            grid, cells = shared['grid'], shared['grid'].reshape(-1)
+            if sticky_points is None:
+                sticky_points = [(n // 2, n // 2)]
+            if isinstance(sticky_points, np.ndarray) and sticky_points.dtype == bool:
+                grid[:n, :n][sticky_points[:n, :n]] = 2
+            else:
+                seeds = np.asarray(sticky_points, dtype=int).reshape(-1, 2)
+                grid[seeds[:, 0], seeds[:, 1]] = 2
+            lattice.mark_frontier(shared['frontier'], np.flatnonzero(cells == 2))
+            x, y = np.divmod(place_walkers(grid, n, n_walkers, normal_distribution), n)
+            shared['pos'][:] = lattice.index(x, y)
+            shared['status'][:] = 1
+            seed = np.random.randint(2 ** 31)  # Seeds the workers' RNGs, so np.random.seed() makes runs reproducible
+
+        with telemetry.phase('stepping'):
+            bounds = strip_bounds(n, n_workers)
+            barrier = multiprocessing.Barrier(n_workers)
+            records = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_strip_worker,
+                                               args=(k, shared.specs, n, lattice.stencil, boundary, bounds,
+                                                     reach, n_walkers, max_iterations, seed, barrier, records))
+                       for k in range(n_workers)]
+            for worker in workers:
+                worker.start()
+            record = None
+            while True:
+                try:
+                    item = records.get(timeout=1.0)
+                except queue.Empty:
+                    if any(worker.exitcode not in (None, 0) for worker in workers):
+                        break  # A strip failed before the first one could say it is done
+                    continue
+                if item is None:
+                    break
+                record = item
+                telemetry.report(*item)
+            for worker in workers:
+                worker.join()
+            failed = [k for k, worker in enumerate(workers) if worker.exitcode != 0]
+            if failed:
+                raise RuntimeError(f"Strip worker(s) {failed} of aggregate_parallel() failed.")
+
+        result = allocate_grid(n)
+        result[:] = grid
+        mobile = np.flatnonzero(shared['status'] == 1)
+        walker_cells = result.reshape(-1)
+        walker_cells[shared['pos'][mobile][walker_cells[shared['pos'][mobile]] != 2]] = 1
+        iteration, n_glued, mobile_count, walker_steps = record if record is not None else (0, 0, n_walkers, 0)
+        if stats is not None:
+            stats.update(iterations=int(iteration), glued=int(n_glued),
+                         absorbed=int(np.count_nonzero(shared['status'] == 0)), workers=n_workers,
+                         worker_seconds=shared['seconds'][:, 0].tolist(), wait_seconds=shared['seconds'][:, 1].tolist())
+    finally:
+        shared.close()
+
+    # Final plot
+    with telemetry.phase('rendering'):
+        if save_plot_dir is not None:
+            from plotting import plot_grid  # Only runs that save plots load matplotlib
+            os.makedirs(save_plot_dir, exist_ok=True)
+            plot_grid(result, neighbor_type, save_plot_dir, f'{save_plot_name}_end')
+
+    record = telemetry.report(iteration, n_glued, mobile_count, walker_steps, final=True)
+    telemetry.close()
+    if stats is not None:
+        stats.update(phase_seconds=record['phases'])
+    return result
@@ -0,0 +1,184 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from storage import allocate_grid
+
+RECORD = np.dtype([('iteration', '<i8'), ('walker', '<i4'), ('x', '<i4'), ('y', '<i4')])
+_HEADER_SIZE = 256  # Fixed .npy header size, so the record count can be rewritten in place
+
+
+def _npy_header(dtype: np.dtype, count: int) -> bytes:
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (count,)}
+    text = repr(header).ljust(_HEADER_SIZE - 11) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) + text.encode('latin1')
+
+
+class _RecordFile:
+    """
+    Append-only .npy file of records. Appends are buffered and each flush rewrites the record count in
+    the header, so the file always loads with np.load(path, mmap_mode='r') up to the last flush.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype, buffer_size: int = 4096, keep: int = None):
+        self.dtype = dtype
+        if keep is None:
+            self.count = 0
+            self._file = open(path, 'w+b')
+            self._file.write(_npy_header(dtype, 0))
+        else:
+            # Reopen an existing log and drop everything after its first `keep` records
+            self.count = keep
+            self._file = open(path, 'r+b')
+            self._file.truncate(_HEADER_SIZE + keep * dtype.itemsize)
+            self._write_header()
+        self._buffer = np.zeros(buffer_size, dtype=dtype)
+        self._pending = 0
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.count))
+
+    def append(self, iteration, walkers, x, y):
+        size = len(walkers)
+        start = 0
+        while start < size:
+            take = min(size - start, self._buffer.size - self._pending)
+            block = self._buffer[self._pending:self._pending + take]
+            block['iteration'] = iteration
+            block['walker'] = walkers[start:start + take]
+            block['x'], block['y'] = x[start:start + take], y[start:start + take]
+            self._pending += take
+            start += take
+            if self._pending == self._buffer.size:
+                self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.seek(_HEADER_SIZE + self.count * self.dtype.itemsize)
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self.count += self._pending
+            self._pending = 0
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class EventLogWriter:
+    """
+    Compact binary log of a simulation, written to a directory: the seed cells (seeds.npy), one record
+    per stick event (events.npy), optional walker-position snapshots every `snapshot_interval`
+    iterations (snapshots.npy) and the lattice settings (meta.json). Records hold the iteration after
+    which the state is seen, the walker id and its x and y.
+
+    Args:
+        path (str): Log directory.
+        n (int): Lattice size.
+        seed_x, seed_y (np.ndarray): Coordinates of the seed cells.
+        neighbor_type (str): NeighborType name, so replays pick the hexagon layout when needed.
+        snapshot_interval (int): Iterations between walker snapshots, None for none.
+        resume_iteration (int): Reopen an existing log and drop the records after this iteration, to
+            continue it from a checkpoint.
+    """
+
+    def __init__(self, path: str, n: int, seed_x, seed_y, neighbor_type: str = None,
+                 snapshot_interval: int = None, resume_iteration: int = None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.meta = {'n': n, 'neighbor_type': neighbor_type, 'snapshot_interval': snapshot_interval,
+                     'iterations': None}
+
+        keep = {}
+        if resume_iteration is None:
+            np.save(os.path.join(path, 'seeds.npy'), np.stack([seed_x, seed_y], axis=1).astype(np.int32))
+        else:
+            for name in ('events', 'snapshots'):
+                records = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                keep[name] = int(np.searchsorted(records['iteration'], resume_iteration, side='right'))
+        self.events = _RecordFile(os.path.join(path, 'events.npy'), RECORD, keep=keep.get('events'))
+        self.snapshots = _RecordFile(os.path.join(path, 'snapshots.npy'), RECORD, keep=keep.get('snapshots'))
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+    def stick(self, iteration: int, walkers, x, y):
+        """Logs the walkers that stuck in the step leading to `iteration`."""
+        self.events.append(iteration, walkers, x, y)
+
+    def snapshot(self, iteration: int, walkers, x, y):
+        """Logs the positions of the mobile walkers, if `iteration` is a snapshot iteration."""
+        if self.snapshot_interval and iteration % self.snapshot_interval == 0:
+            self.snapshots.append(iteration, walkers, x, y)
+
+    def flush(self):
+        self.events.flush()
+        self.snapshots.flush()
+
+    def close(self, iterations: int = None):
+        self.events.close()
+        self.snapshots.close()
+        self.meta['iterations'] = None if iterations is None else int(iterations)
+        self._write_meta()
+
+
+class EventLogReader:
+    """
+    Reconstructs lattices from an EventLogWriter directory. The cluster at any iteration is exact; the
+    mobile walkers come from the nearest snapshot at or before it, minus the walkers stuck since.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.n = self.meta['n']
+        self.neighbor_type = self.meta['neighbor_type']
+        self.seeds = np.load(os.path.join(path, 'seeds.npy'))
+        self.events = np.load(os.path.join(path, 'events.npy'), mmap_mode='r')
+        self.snapshots = np.load(os.path.join(path, 'snapshots.npy'), mmap_mode='r')
+        last = [int(records['iteration'][-1]) for records in (self.events, self.snapshots) if records.size]
+        self.iterations = self.meta['iterations'] if self.meta['iterations'] is not None else max(last, default=0)
+
+    def grid_at(self, iteration: int) -> np.ndarray:
+        """(n + 2, n + 2) uint8 lattice as it was after `iteration` iterations."""
+        grid = allocate_grid(self.n)
+        self._draw(grid, iteration)
+        return grid
+
+    def _draw(self, grid, iteration, after: int = -1):
+        # Cluster cells stuck in (after, iteration], and walkers of the nearest snapshot still mobile
+        events = self.events
+        lo = np.searchsorted(events['iteration'], after, side='right')
+        hi = np.searchsorted(events['iteration'], iteration, side='right')
+        if after < 0:
+            grid[self.seeds[:, 0], self.seeds[:, 1]] = 2
+        grid[events['x'][lo:hi], events['y'][lo:hi]] = 2
+
+        grid[grid == 1] = 0
+        snapshots = self.snapshots
+        end = np.searchsorted(snapshots['iteration'], iteration, side='right')
+        if end == 0:
+            return
+        at = snapshots['iteration'][end - 1]
+        start = np.searchsorted(snapshots['iteration'], at, side='left')
+        walkers = snapshots[start:end]
+        stuck = events['walker'][np.searchsorted(events['iteration'], at, side='right'):hi]
+        walkers = walkers[~np.isin(walkers['walker'], stuck)]
+        free = grid[walkers['x'], walkers['y']] != 2
+        grid[walkers['x'][free], walkers['y'][free]] = 1
+
+    def frames(self, iterations):
+        """Yields (iteration, grid) for increasing iterations, updating one lattice incrementally."""
+        grid = allocate_grid(self.n)
+        previous = -1
+        for iteration in iterations:
+            self._draw(grid, iteration, previous)
+            previous = iteration
+            yield iteration, grid
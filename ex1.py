@@ -2,9 +2,9 @@ import itertools
 import os
 
 import numpy as np
-from matplotlib import pyplot as plt
 
 from mas_radius import mas_radius
+from scheduler import Task, run_serially
 
 
 def mass_radius_line():
@@ -41,10 +41,17 @@ def mass_radius_square():
     return grid, radii, mas_radius_result, slope
 
 
-def build_ex1():
+def tasks_ex1():
+    return [Task('line', mass_radius_line),
+            Task('square', mass_radius_square)]
+
+
+def summarize_ex1(results):
+    from matplotlib import pyplot as plt  # Here, as pool workers import this module for its tasks only
+
     # Step 1: Get the grids and mass-radius values, including radius values for x-axis
-    line_grid, radius_values_line, mass_radius_line_values, slope_line = mass_radius_line()
-    square_grid, radius_values_square, mass_radius_square_values, slope_square = mass_radius_square()
+    line_grid, radius_values_line, mass_radius_line_values, slope_line = results['line']
+    square_grid, radius_values_square, mass_radius_square_values, slope_square = results['square']
 
     # Step 2: Plot the grids (line grid and square grid)
     fig1, axs = plt.subplots(1, 2, figsize=(12, 6))
@@ -117,5 +124,9 @@ def build_ex1():
     # plt.show()
 
 
+def build_ex1():
+    summarize_ex1(run_serially(tasks_ex1()))
+
+
 if __name__ == '__main__':
     build_ex1()
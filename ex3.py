@@ -1,25 +1,36 @@
-
 import numpy as np
-import matplotlib.pyplot as plt
 
-from aggregation import aggregate
+from aggregation import aggregate, Engine
 from box_count import box_count
+from result_cache import EXERCISE_CACHE
+from scheduler import Task, run_serially
 
+N = 128
+RATIO_VALUES = np.linspace(0.02, 0.5, 30)
+SEED_OFFSET = 3000  # Each exercise seeds from its own range, so no two share a run (or a cache entry)
+
+
+def simulate_ratio(n, ratio, seed=None):
+    walkers = round(n * n * ratio)
+    grid = aggregate(n, walkers, save_plot_dir='target\\ex3',
+                     save_plot_name=f'ratio_{ratio:0.2f}', sticky_points=[(n//2, n//2)],
+                     create_video=True, cache=EXERCISE_CACHE, seed=seed, engine=Engine.BATCH)
+    _, _, _, slope = box_count(n, grid)
+    return slope
+
+
+def tasks_ex3():
+    return [Task(f'ratio_{i}', simulate_ratio, (N, ratio, SEED_OFFSET + i), cost=round(N * N * ratio))
+            for i, ratio in enumerate(RATIO_VALUES)]
 
-def build_ex3():
-    n = 128
-    ratio_values = np.linspace(0.02, 0.5, 30)
-    slopes = []
-    for ratio in ratio_values:
-        walkers = round(n * n * ratio)
-        grid = aggregate(n, walkers, save_plot_dir='target\\ex3',
-                         save_plot_name=f'ratio_{ratio:0.2f}', sticky_points=[(n//2, n//2)],
-                         create_video=True)
-        _, _, _, slope = box_count(n, grid)
-        slopes.append(slope)
+
+def summarize_ex3(results):
+    import matplotlib.pyplot as plt
+
+    slopes = [results[f'ratio_{i}'] for i in range(len(RATIO_VALUES))]
 
     fig, ax = plt.subplots(figsize=(8, 6))  # Create figure and axes
-    ax.plot(ratio_values, slopes, marker='o', linestyle='-', color='b')  # Plot the data
+    ax.plot(RATIO_VALUES, slopes, marker='o', linestyle='-', color='b')  # Plot the data
     ax.set_title('Fractal Dimension (Slope) vs Ratio')  # Set title
     ax.set_xlabel('Ratio of Occupied Nodes')  # Set x-axis label
     ax.set_ylabel('Fractal Dimension (Slope)')  # Set y-axis label
@@ -29,5 +40,9 @@ def build_ex3():
     fig.savefig('target/ex3/fractal_dimension_vs_ratio.png', dpi=300, bbox_inches='tight')
 
 
+def build_ex3():
+    summarize_ex3(run_serially(tasks_ex3()))
+
+
 if __name__ == '__main__':
     build_ex3()
@@ -2,49 +2,52 @@ import os
 import numpy as np
 
 from aggregation import aggregate
+from result_cache import EXERCISE_CACHE
+from scheduler import Task, run_serially
 
+SEED_OFFSET = 4000  # Seed range of this exercise, see ex3
 
-def build_ex4_example(n, n_walkers, sticky_points, distribution_type, example_name, normal_distribution=None):
+
+def build_ex4_example(n, n_walkers, sticky_points, distribution_type, example_name, normal_distribution=None,
+                      seed=None):
     save_dir = f'target\\ex4\\example_{example_name}'
+    n_sticky = np.count_nonzero(sticky_points) if isinstance(sticky_points, np.ndarray) else len(sticky_points)
     os.makedirs(save_dir, exist_ok=True)
 
     grid = aggregate(n, n_walkers, save_plot_dir=save_dir,
-                     save_plot_name=f'{distribution_type}_n_{n}_walkers_{n_walkers}_sticky_{len(sticky_points)}',
-                     sticky_points=sticky_points, create_video=True,
-                     normal_distribution=normal_distribution)
+                     save_plot_name=f'{distribution_type}_n_{n}_walkers_{n_walkers}_sticky_{n_sticky}',
+                     sticky_points=sticky_points, create_video=True, cache=EXERCISE_CACHE,
+                     normal_distribution=normal_distribution, seed=seed)
 
 
-# Function to generate circular sticky points
+# Function to generate circular sticky points as a boolean mask
 def generate_circle_sticky_points(n, radius):
     center_x, center_y = n // 2, n // 2  # Center of the grid
-    sticky_points = []
+    angle = np.linspace(0, 2 * np.pi, num=360)
+    x = (center_x + radius * np.cos(angle)).astype(int)
+    y = (center_y + radius * np.sin(angle)).astype(int)
+    inside = (0 <= x) & (x < n) & (0 <= y) & (y < n)  # Ensure points are within grid bounds
 
-    for angle in np.linspace(0, 2 * np.pi, num=360):
-        x = int(center_x + radius * np.cos(angle))
-        y = int(center_y + radius * np.sin(angle))
-        if 0 <= x < n and 0 <= y < n:  # Ensure points are within grid bounds
-            sticky_points.append((x, y))
+    sticky_points = np.zeros((n, n), dtype=bool)
+    sticky_points[x[inside], y[inside]] = True
     return sticky_points
 
 
-# Function to generate triangular sticky points
+# Function to generate triangular sticky points as a boolean mask
 def generate_triangle_sticky_points(n, base_height_ratio=0.5):
     base_width = n // 2
     height = int(base_height_ratio * n)
     center_x, center_y = n // 2, n // 2  # Center of the grid
-    sticky_points = []
+    x, y = np.ogrid[:n, :n]
 
-    for y in range(center_y, center_y + height):
-        start_x = center_x - (base_width * (y - center_y)) // height
-        end_x = center_x + (base_width * (y - center_y)) // height
-        for x in range(start_x, end_x + 1):
-            sticky_points.append((x, y))
-    return sticky_points
+    # Row y of the triangle spans center_x +/- base_width * (y - center_y) // height
+    depth = y - center_y
+    return (depth >= 0) & (depth < height) & (np.abs(x - center_x) <= (base_width * depth) // height)
 
 
 # Generate 10 Examples
 
-def generate_examples():
+def example_parameters():
     n = 128  # Grid size
     examples = []
 
@@ -83,10 +86,24 @@ def generate_examples():
     # Example 10: Circular sticky points with radius 30, Gaussian distribution
     examples.append(("gaussian", n, 1200, sticky_points, "gaussian_circle_r30", 30.0))
 
+    return examples
+
+
+def tasks_ex4():
+    return [Task(example_name, build_ex4_example,
+                 (n, n_walkers, sticky_points, distribution_type, example_name, normal_distribution, SEED_OFFSET + i),
+                 cost=n_walkers)
+            for i, (distribution_type, n, n_walkers, sticky_points, example_name, normal_distribution)
+            in enumerate(example_parameters())]
+
+
+def summarize_ex4(results):
+    pass  # Every example saves its own plots and video
+
+
+def generate_examples():
     # Run the 10 examples
-    for example in examples:
-        distribution_type, n, n_walkers, sticky_points, example_name, normal_distribution = example
-        build_ex4_example(n, n_walkers, sticky_points, distribution_type, example_name, normal_distribution)
+    summarize_ex4(run_serially(tasks_ex4()))
 
 
 def build_ex4():
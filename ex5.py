@@ -1,25 +1,37 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
-from aggregation import aggregate, NeighborType
+from aggregation import aggregate, NeighborType, Engine
 from box_count import box_count
+from result_cache import EXERCISE_CACHE
+from scheduler import Task, run_serially
 
+N = 128
+RATIO_VALUES = np.linspace(0.02, 0.5, 30)
+SEED_OFFSET = 5000  # Seed range of this exercise, see ex3
+
+
+def simulate_ratio(n, ratio, seed=None):
+    walkers = round(n * n * ratio)
+    grid = aggregate(n, walkers, save_plot_dir='target\\ex5',
+                     save_plot_name=f'ratio_{ratio:0.2f}_four_neighbors', sticky_points=[(n // 2, n // 2)],
+                     neighbor_type=NeighborType.FOUR_NEIGHBORS,
+                     create_video=True, cache=EXERCISE_CACHE, seed=seed, engine=Engine.BATCH)
+    _, _, _, slope = box_count(n, grid)
+    return slope
+
+
+def tasks_ex5():
+    return [Task(f'ratio_{i}', simulate_ratio, (N, ratio, SEED_OFFSET + i), cost=round(N * N * ratio))
+            for i, ratio in enumerate(RATIO_VALUES)]
 
-def build_ex5():
-    n = 128
-    ratio_values = np.linspace(0.02, 0.5, 30)
-    slopes = []
-    for ratio in ratio_values:
-        walkers = round(n * n * ratio)
-        grid = aggregate(n, walkers, save_plot_dir='target\\ex5',
-                         save_plot_name=f'ratio_{ratio:0.2f}_four_neighbors', sticky_points=[(n // 2, n // 2)],
-                         neighbor_type=NeighborType.FOUR_NEIGHBORS,
-                         create_video=True)
-        _, _, _, slope = box_count(n, grid)
-        slopes.append(slope)
+
+def summarize_ex5(results):
+    import matplotlib.pyplot as plt
+
+    slopes = [results[f'ratio_{i}'] for i in range(len(RATIO_VALUES))]
 
     fig, ax = plt.subplots(figsize=(8, 6))  # Create figure and axes
-    ax.plot(ratio_values, slopes, marker='o', linestyle='-', color='b')  # Plot the data
+    ax.plot(RATIO_VALUES, slopes, marker='o', linestyle='-', color='b')  # Plot the data
     ax.set_title('Fractal Dimension (Slope) vs Ratio for 4 neighbors')  # Set title
     ax.set_xlabel('Ratio of Occupied Nodes')  # Set x-axis label
     ax.set_ylabel('Fractal Dimension (Slope)')  # Set y-axis label
@@ -29,5 +41,9 @@ def build_ex5():
     fig.savefig('target/ex5/fractal_dimension_vs_ratio.png', dpi=300, bbox_inches='tight')
 
 
+def build_ex5():
+    summarize_ex5(run_serially(tasks_ex5()))
+
+
 if __name__ == '__main__':
     build_ex5()
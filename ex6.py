@@ -1,33 +1,46 @@
-import matplotlib.pyplot as plt
-
 from aggregation import aggregate, NeighborType
 from mas_radius import mas_radius
+from result_cache import EXERCISE_CACHE
+from scheduler import Task, run_serially
 
+N = 128
+N_EXAMPLES = 3
+SEED_OFFSET = 6000  # Seed range of this exercise, see ex3
 
-def build_ex6():
-    n = 128
-    slopes = []
-    for i in range(3):
-        grid = aggregate(n, 1000,
-                         save_plot_dir=f'target\\ex6\\example_{i}',
-                         save_plot_name=f'six_n',
-                         sticky_points=[(n // 2, n // 2)],
-                         neighbor_type=NeighborType.SIX_NEIGHBORS_TRIANGULAR,
-                         create_video=True)
-        plt.imshow(grid)
-        _, _, slope = mas_radius(grid, n,
-                                 center_x=n // 2,
-                                 center_y=n // 2,
-                                 min_radius=0,
-                                 max_radius=(n // 3) // 2,
-                                 samples=10,
-                                 occupied_value=2)
-        slopes.append(slope)
+
+def simulate_example(n, i):
+    grid = aggregate(n, 1000,
+                     save_plot_dir=f'target\\ex6\\example_{i}',
+                     save_plot_name=f'six_n',
+                     sticky_points=[(n // 2, n // 2)],
+                     neighbor_type=NeighborType.SIX_NEIGHBORS_TRIANGULAR,
+                     create_video=True, cache=EXERCISE_CACHE, seed=SEED_OFFSET + i)
+    _, _, slope = mas_radius(grid, n,
+                             center_x=n // 2,
+                             center_y=n // 2,
+                             min_radius=0,
+                             max_radius=(n // 3) // 2,
+                             samples=10,
+                             occupied_value=2)
+    return slope
+
+
+def tasks_ex6():
+    # Hexagon frames make each triangular run far costlier than its walker count suggests
+    return [Task(f'example_{i}', simulate_example, (N, i), cost=10 * 1000) for i in range(N_EXAMPLES)]
+
+
+def summarize_ex6(results):
+    slopes = [results[f'example_{i}'] for i in range(N_EXAMPLES)]
 
     with open(f'target\\ex6\\slope.txt', 'w') as f:
         for value in slopes:
             f.write(f'slope={value:.2f}\n')
 
 
+def build_ex6():
+    summarize_ex6(run_serially(tasks_ex6()))
+
+
 if __name__ == '__main__':
     build_ex6()
@@ -0,0 +1,76 @@
+import functools
+
+import numpy as np
+
+
+class FirstPassage:
+    """
+    Exit statistics of a lattice random walk started at the centre of an empty square of
+    half-width L. Holds the joint law of the exit cell (Chebyshev distance L) and the number of
+    steps taken, so a walker with no obstacles inside the square can be fast-forwarded to the
+    boundary with a single draw. The law is truncated once less than `tolerance` of the probability
+    is still inside the square, so the walk statistics match single steps to within that tolerance.
+    """
+
+    def __init__(self, half_width: int, parity: int, move_dx: tuple, move_dy: tuple,
+                 tolerance: float = 1e-9):
+        move_dx, move_dy = np.array(move_dx), np.array(move_dy)
+        self.half_width = half_width
+        self.parity = parity
+        side = 2 * half_width + 1
+        u, v = np.meshgrid(np.arange(-half_width, half_width + 1),
+                           np.arange(-half_width, half_width + 1), indexing='ij')
+        u, v = u.ravel(), v.ravel()
+        interior = np.maximum(np.abs(u), np.abs(v)) < half_width
+
+        # Moves depend on the absolute row parity, which is the start parity shifted by u
+        row_parity = (parity + u[interior]) % 2
+        target_u = u[interior][:, None] + move_dx[row_parity]
+        target_v = v[interior][:, None] + move_dy[row_parity]
+        self._targets = ((target_u + half_width) * side + target_v + half_width).ravel()
+        self._n_moves = move_dx.shape[1]
+        self._size = side * side
+        self._interior = np.flatnonzero(interior)
+        self._boundary = np.flatnonzero(~interior)
+        self._center = self._size // 2
+        self.offsets_u, self.offsets_v = u, v
+
+        # Evolve the occupation probabilities until almost all of the mass has left the square
+        p = np.zeros(self._size)
+        p[self._center] = 1.0
+        exits = []
+        while p.sum() > tolerance:
+            p = self._step(p)
+            exits.append(p[self._boundary])
+            p[self._boundary] = 0.0
+        self._cdf = np.cumsum(np.array(exits).ravel())
+        self._cdf /= self._cdf[-1]
+        self.mean_steps = float(np.dot(np.arange(1, len(exits) + 1), np.array(exits).sum(axis=1)))
+
+    def _step(self, p):
+        return np.bincount(self._targets, weights=np.repeat(p[self._interior] / self._n_moves, self._n_moves),
+                           minlength=self._size)
+
+    def sample_exit(self) -> tuple[int, int, int]:
+        """Returns the exit offset (du, dv) and the number of steps it took."""
+        k = int(np.searchsorted(self._cdf, np.random.random(), side='right'))
+        k = min(k, self._cdf.size - 1)
+        steps, cell = divmod(k, self._boundary.size)
+        cell = self._boundary[cell]
+        return int(self.offsets_u[cell]), int(self.offsets_v[cell]), steps + 1
+
+    def sample_position(self, steps: int) -> tuple[int, int]:
+        """Returns the offset after the given number of steps, given the walker has not exited yet."""
+        p = np.zeros(self._size)
+        p[self._center] = 1.0
+        for _ in range(steps):
+            p = self._step(p)
+            p[self._boundary] = 0.0
+        cell = np.random.choice(self._size, p=p / p.sum())
+        return int(self.offsets_u[cell]), int(self.offsets_v[cell])
+
+
+@functools.lru_cache(maxsize=None)
+def first_passage_table(half_width: int, parity: int, move_dx: tuple, move_dy: tuple) -> FirstPassage:
+    """Cached FirstPassage for a square half-width, start row parity and (2, k) move stencil."""
+    return FirstPassage(half_width, parity, move_dx, move_dy)
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class GrowthMetrics:
+    """
+    Fractal statistics of a growing cluster, updated per stick event instead of per analysis pass.
+
+    Keeps, for every box size 2^k of box_count, a flag per box and the number of occupied boxes; a
+    histogram of the cluster's distances to the centre (the mass-radius curve is its cumulative sum);
+    and running sums for the radius of gyration and the max radius. Adding a cell costs O(levels).
+    record() appends the current values to a time series, so growth curves need no extra passes over
+    the grid.
+
+    Args:
+        n (int): Lattice size.
+        center (tuple): Centre of the radial statistics, defaults to the centroid of the first cells
+            added (the seeds).
+    """
+
+    def __init__(self, n: int, center: tuple[float, float] = None):
+        self.n = n
+        n_scales = 1  # Same scales as box_count
+        while (2 ** n_scales < n) and (n_scales < 100):
+            n_scales += 1
+        self.scale = 2.0 ** np.arange(1, n_scales + 1)
+        self.boxes = [np.zeros((n >> k, n >> k), dtype=bool) for k in range(1, n_scales + 1)]
+        self.n_box = np.zeros(n_scales, dtype=int)
+        self.center = center
+        self.histogram = np.zeros(int(np.ceil(np.sqrt(2) * n)) + 2, dtype=int)
+        self.mass = 0
+        self.r_max = 0.0
+        self._sum_x, self._sum_y, self._sum_r2 = 0.0, 0.0, 0.0
+        self._series = []
+
+    def add(self, x, y):
+        """Adds newly stuck cells, given as coordinate arrays."""
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        if x.size == 0:
+            return
+        if self.center is None:
+            self.center = (float(x.mean()), float(y.mean()))
+
+        for k, boxes in enumerate(self.boxes, start=1):
+            bx, by = x >> k, y >> k
+            inside = (bx < boxes.shape[0]) & (by < boxes.shape[1])  # Only whole boxes are counted
+            bx, by = bx[inside], by[inside]
+            new = ~boxes[bx, by]
+            boxes[bx[new], by[new]] = True
+            self.n_box[k - 1] = self.n_box[k - 1] + np.unique(bx[new] * boxes.shape[1] + by[new]).size
+
+        distance = np.hypot(x - self.center[0], y - self.center[1])
+        np.add.at(self.histogram, distance.astype(int), 1)
+        self.r_max = max(self.r_max, float(distance.max()))
+        self.mass += x.size
+        self._sum_x += float(x.sum())
+        self._sum_y += float(y.sum())
+        self._sum_r2 += float((x.astype(float) ** 2 + y.astype(float) ** 2).sum())
+
+    @property
+    def r_gyration(self) -> float:
+        if self.mass == 0:
+            return 0.0
+        mean_x, mean_y = self._sum_x / self.mass, self._sum_y / self.mass
+        return float(np.sqrt(max(self._sum_r2 / self.mass - mean_x ** 2 - mean_y ** 2, 0.0)))
+
+    def box_dimension(self) -> float:
+        """Slope of log(n_box) against log(1 / scale), like box_count, over the occupied scales."""
+        used = self.n_box > 0
+        slope, _ = np.polyfit(np.log(1.0 / self.scale[used]), np.log(self.n_box[used]), 1)
+        return slope
+
+    def mass_radius(self) -> tuple[np.ndarray, np.ndarray]:
+        """Radii 1, 2, ... up to the max radius and the number of cluster cells closer than each."""
+        radii = np.arange(1, int(self.r_max) + 2)
+        return radii, np.cumsum(self.histogram)[radii - 1]
+
+    def record(self, iteration: int):
+        """Appends the current values to the time series."""
+        self._series.append((iteration, self.mass, self.r_gyration, self.r_max, self.n_box.copy()))
+
+    def series(self) -> dict:
+        """Time series of the recorded values as arrays; n_box has one column per box size."""
+        if not self._series:
+            return {'iteration': np.zeros(0, dtype=int), 'mass': np.zeros(0, dtype=int),
+                    'r_gyration': np.zeros(0), 'r_max': np.zeros(0), 'n_box': np.zeros((0, self.scale.size))}
+        iteration, mass, r_gyration, r_max, n_box = zip(*self._series)
+        return {'iteration': np.array(iteration), 'mass': np.array(mass), 'r_gyration': np.array(r_gyration),
+                'r_max': np.array(r_max), 'n_box': np.array(n_box)}
@@ -0,0 +1,173 @@
+from enum import Enum, auto
+from typing import NamedTuple
+
+import numpy as np
+
+
+class NeighborType(Enum):
+    EIGHT_NEIGHBORS = auto()
+    FOUR_NEIGHBORS = auto()
+    SIX_NEIGHBORS_TRIANGULAR = auto()  # New type for 6-neighbor triangular lattice
+
+
+class Boundary(Enum):
+    PERIODIC = auto()  # Walkers leaving one edge re-enter on the opposite edge
+    REFLECTING = auto()  # Moves across the edge are rejected
+    ABSORBING = auto()  # Walkers crossing the edge are removed
+
+
+class Stencil(NamedTuple):
+    """
+    Move and sticking offsets as (2, k) arrays of (row, column) steps indexed by row parity
+    (row 0 for even rows, row 1 for odd rows). New lattice types only need a new Stencil.
+    """
+    move_dx: np.ndarray
+    move_dy: np.ndarray
+    stick_dx: np.ndarray
+    stick_dy: np.ndarray
+
+
+_SQUARE_MOVES = (np.array([[-1, 0, 1, 0]] * 2), np.array([[0, -1, 0, 1]] * 2))  # Random walk uses 4 directions
+_TRIANGULAR = (np.array([[0, 1, 1, 0, -1, -1],
+                         [1, 1, 0, -1, -1, 0]]),
+               np.array([[-1, -1, 0, 1, 0, -1],
+                         [1, 0, 1, 1, 0, -1]]))
+
+STENCILS = {
+    NeighborType.EIGHT_NEIGHBORS: Stencil(*_SQUARE_MOVES,
+                                          np.array([[-1, 0, 1, 0, -1, 1, 1, -1]] * 2),
+                                          np.array([[0, -1, 0, 1, -1, -1, 1, 1]] * 2)),
+    NeighborType.FOUR_NEIGHBORS: Stencil(*_SQUARE_MOVES, *_SQUARE_MOVES),
+    NeighborType.SIX_NEIGHBORS_TRIANGULAR: Stencil(*_TRIANGULAR, *_TRIANGULAR),
+}
+
+
+def get_stencil(neighbor_type: NeighborType | Stencil) -> Stencil:
+    """Returns the stencil of a NeighborType, or the user-defined stencil itself."""
+    if isinstance(neighbor_type, Stencil):
+        return neighbor_type
+    return STENCILS[neighbor_type]
+
+
+class Lattice:
+    """
+    Flat-index topology of an n x n lattice stored in the (n + 2, n + 2) grid layout.
+
+    Cell (i, j) has flat index i * (n + 2) + j. Rows and columns n and n + 1 are ghost cells: a step off
+    the high edge lands on index n and a step off the low edge lands on index -1, which wraps onto index
+    n + 1 modulo the lattice size. `ghost_remap` sends every ghost cell either to the interior cell it
+    wraps to (periodic) or to itself (reflecting and absorbing). Row parity and the ghost test are plain
+    arithmetic on the flat index, so the tables take O(n) memory and a move is
+    `resolve(cell + move_offsets[row_parity(cell), k])`, with no modulo over rows and no parity branches.
+    """
+
+    def __init__(self, n: int, stencil: Stencil, boundary: Boundary = Boundary.PERIODIC):
+        self.n = n
+        self.width = n + 2
+        self.size = self.width * self.width
+        self.boundary = boundary
+        self.stencil = stencil
+        self.move_offsets = stencil.move_dx * self.width + stencil.move_dy
+        self.stick_offsets = stencil.stick_dx * self.width + stencil.stick_dy
+        self.n_moves = self.move_offsets.shape[1]
+        self.index_dtype = np.int32 if self.size < 2 ** 31 else np.int64
+
+        # Ghost cells in slot order: columns n and n + 1 of every row, then rows n and n + 1
+        rows = np.arange(self.width)
+        cells = [(rows[:, None] * self.width + np.array([n, n + 1])).ravel(),
+                 (np.array([n, n + 1])[:, None] * self.width + np.arange(n)).ravel()]
+        self._ghost_cells = np.concatenate(cells).astype(self.index_dtype)
+        self.ghost_remap = self._ghost_cells.copy()
+
+        # Resolve every ghost cell the stencils (and the reversed sticking stencil used to mark the
+        # frontier) can reach, and check no step skips over the ghost cells
+        reach = max(int(np.abs(offsets).max()) for offsets in stencil)
+        band = np.unique(np.r_[np.arange(min(reach, n)), np.arange(max(n - reach, 0), n)])
+        middle = np.setdiff1d(np.arange(n), band)  # Cells further in never leave the interior
+        i = np.concatenate([np.repeat(band, n), np.repeat(middle, band.size)])
+        j = np.concatenate([np.tile(np.arange(n), band.size), np.tile(band, middle.size)])
+        for parity in (0, 1):
+            own = i % 2 == parity
+            for dx, dy in zip(np.concatenate([stencil.move_dx[parity], stencil.stick_dx[parity]]),
+                              np.concatenate([stencil.move_dy[parity], stencil.stick_dy[parity]])):
+                self._resolve(i[own], j[own], dx, dy)
+                self._resolve(i, j, -dx, -dy)
+
+        self._flat_moves = self.move_offsets.ravel()  # Indexed by parity * n_moves + direction
+
+        # Plain Python copies for the walker-at-a-time loops
+        self._move_lists = self.move_offsets.tolist()
+        self._ghost_list = self.ghost_remap.tolist()
+
+    def _resolve(self, i, j, dx, dy):
+        n = self.n
+        raw = ((i * self.width + j) + dx * self.width + dy) % self.size
+        wrapped = ((i + dx) % n) * self.width + (j + dy) % n
+        inside = ~self.is_ghost(raw)
+        if (raw[inside] != wrapped[inside]).any():
+            raise ValueError("Stencil reaches past the ghost cells of the lattice.")
+        if self.boundary == Boundary.PERIODIC:
+            slot, wrapped = self._slot(raw[~inside]), wrapped[~inside]
+            resolved = self.ghost_remap[slot] != self._ghost_cells[slot]
+            if (self.ghost_remap[slot[resolved]] != wrapped[resolved]).any():
+                raise ValueError("Stencil reaches past the ghost cells of the lattice.")
+            self.ghost_remap[slot] = wrapped
+
+    def _slot(self, cell):
+        row, column = np.divmod(cell, self.width)
+        return np.where(column >= self.n, 2 * row + column - self.n, 2 * self.width + (row - self.n) * self.n + column)
+
+    @classmethod
+    def from_neighbor_type(cls, n: int, neighbor_type: NeighborType | Stencil,
+                           boundary: Boundary = Boundary.PERIODIC) -> 'Lattice':
+        return cls(n, get_stencil(neighbor_type), boundary)
+
+    def index(self, x, y):
+        """Flat index of interior cell(s) (x, y)."""
+        return x * self.width + y
+
+    def coordinates(self, cell):
+        """(x, y) of flat index/indices."""
+        return np.divmod(cell, self.width)
+
+    def row_parity(self, cell):
+        """Parity of the row of flat index/indices, which selects the stencil half."""
+        return (cell // self.width) & 1
+
+    def is_ghost(self, cell):
+        """True for flat indices in the ghost rows and columns."""
+        return (cell % self.width >= self.n) | (cell >= self.n * self.width)
+
+    def resolve(self, raw):
+        """Maps raw flat indices (possibly negative, one step past an edge) onto lattice cells."""
+        raw = np.array(raw, dtype=self.index_dtype)
+        raw[raw < 0] += self.size  # Off the low edge of row 0
+        ghost = self.is_ghost(raw)
+        if ghost.any():
+            raw[ghost] = self.ghost_remap[self._slot(raw[ghost])]
+        return raw
+
+    def step(self, cell, direction):
+        """Cell(s) reached by moving in the given direction(s); ghost cells mark a crossed edge."""
+        return self.resolve(cell + self._flat_moves[self.row_parity(cell) * self.n_moves + direction])
+
+    def step_one(self, cell: int, direction: int) -> int:
+        """step() for a single walker with Python ints, for the walker-at-a-time loops."""
+        width, n = self.width, self.n
+        raw = (cell + self._move_lists[(cell // width) & 1][direction]) % self.size
+        row, column = divmod(raw, width)
+        if column >= n:
+            return self._ghost_list[2 * row + column - n]
+        if row >= n:
+            return self._ghost_list[2 * width + (row - n) * n + column]
+        return raw
+
+    def mark_frontier(self, frontier, cluster_cells):
+        """
+        Marks every cell whose sticky stencil reaches one of the cluster cells.
+        `frontier` is a flat bool array of the lattice size.
+        """
+        for parity in (0, 1):
+            seen_by = self.resolve(cluster_cells[:, None] - self.stick_offsets[parity])
+            own = (self.row_parity(seen_by) == parity) & ~self.is_ghost(seen_by)  # Only rows using this stencil half
+            frontier[seen_by[own]] = True
@@ -0,0 +1,75 @@
+import itertools
+from enum import Enum, auto
+
+import numpy as np
+
+from lattice import Boundary
+
+
+class NeighborType3D(Enum):
+    SIX_NEIGHBORS = auto()  # Face neighbours
+    EIGHTEEN_NEIGHBORS = auto()  # Face and edge neighbours
+    TWENTY_SIX_NEIGHBORS = auto()  # Face, edge and corner neighbours
+
+
+_OFFSETS = np.array([d for d in itertools.product((-1, 0, 1), repeat=3) if any(d)])
+_NORMS = np.abs(_OFFSETS).sum(axis=1)  # 1 for faces, 2 for edges, 3 for corners
+
+MOVE_OFFSETS_3D = _OFFSETS[_NORMS == 1]  # Random walk uses the 6 face directions
+STICK_OFFSETS_3D = {
+    NeighborType3D.SIX_NEIGHBORS: _OFFSETS[_NORMS == 1],
+    NeighborType3D.EIGHTEEN_NEIGHBORS: _OFFSETS[_NORMS <= 2],
+    NeighborType3D.TWENTY_SIX_NEIGHBORS: _OFFSETS,
+}
+
+
+class CubicLattice:
+    """
+    Topology of an n x n x n simple cubic lattice. Cells are (x, y, z) coordinate arrays; index() gives
+    the flat index x * n^2 + y * n + z. Walkers step to one of the 6 face neighbours and stick next to
+    the cluster under the 6-, 18- or 26-neighbour stencil. The stencils are symmetric, so the cells that
+    see a cluster cell are its own neighbours.
+    """
+
+    def __init__(self, n: int, neighbor_type: NeighborType3D = NeighborType3D.SIX_NEIGHBORS,
+                 boundary: Boundary = Boundary.PERIODIC):
+        self.n = n
+        self.boundary = boundary
+        self.neighbor_type = neighbor_type
+        self.move_offsets = MOVE_OFFSETS_3D
+        self.stick_offsets = STICK_OFFSETS_3D[neighbor_type]
+        self.n_moves = len(self.move_offsets)
+
+    def index(self, x, y, z):
+        """Flat index of cell(s) (x, y, z)."""
+        return (np.asarray(x, dtype=np.int64) * self.n + y) * self.n + z
+
+    def step(self, x, y, z, direction):
+        """
+        Cells reached by moving in the given directions and a mask of the walkers that crossed an edge.
+        Periodic moves wrap around and never cross; walkers crossing another boundary keep their cell.
+        """
+        d = self.move_offsets[direction]
+        x, y, z = x + d[:, 0], y + d[:, 1], z + d[:, 2]
+        if self.boundary == Boundary.PERIODIC:
+            return x % self.n, y % self.n, z % self.n, np.zeros(x.shape, dtype=bool)
+        crossed = ((x < 0) | (x >= self.n)) | ((y < 0) | (y >= self.n)) | ((z < 0) | (z >= self.n))
+        x[crossed] -= d[crossed, 0]
+        y[crossed] -= d[crossed, 1]
+        z[crossed] -= d[crossed, 2]
+        return x, y, z, crossed
+
+    def neighbors(self, x, y, z):
+        """Cells of the sticking stencil around the given cells, wrapped or clipped at the edges."""
+        x = (np.asarray(x)[:, None] + self.stick_offsets[:, 0]).ravel()
+        y = (np.asarray(y)[:, None] + self.stick_offsets[:, 1]).ravel()
+        z = (np.asarray(z)[:, None] + self.stick_offsets[:, 2]).ravel()
+        if self.boundary == Boundary.PERIODIC:
+            return x % self.n, y % self.n, z % self.n
+        inside = (x >= 0) & (x < self.n) & (y >= 0) & (y < self.n) & (z >= 0) & (z < self.n)
+        return x[inside], y[inside], z[inside]
+
+    def mark_frontier(self, frontier, x, y, z):
+        """Marks the cells whose sticky stencil reaches one of the cluster cells, in a BitVolume."""
+        if np.size(x):
+            frontier.set(*self.neighbors(x, y, z))
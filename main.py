@@ -1,22 +1,30 @@
 import concurrent.futures
+import multiprocessing
 
-from ex1 import build_ex1
-from ex3 import build_ex3
-from ex4 import build_ex4
-from ex5 import build_ex5
-from ex6 import build_ex6
+from ex1 import tasks_ex1, summarize_ex1
+from ex3 import tasks_ex3, summarize_ex3
+from ex4 import tasks_ex4, summarize_ex4
+from ex5 import tasks_ex5, summarize_ex5
+from ex6 import tasks_ex6, summarize_ex6
+from scheduler import run_exercises
+from telemetry import ProgressMonitor, run_job, worker_initializer
 
 
-def run_functions_in_process_pool(functions):
+def run_functions_in_process_pool(functions, on_progress=None):
     """
     Runs the given functions concurrently in a process pool.
+    Progress records of the simulations they run are sent back and reported per job, named after
+    the function, from this process.
 
     Parameters:
     functions (list): List of functions to execute. Each function should take no parameters.
+    on_progress (callable): Called with every progress record, defaults to a one-line print per record.
     """
-    with concurrent.futures.ProcessPoolExecutor() as executor:
+    with multiprocessing.Manager() as manager, ProgressMonitor(manager.Queue(), on_progress) as monitor, \
+            concurrent.futures.ProcessPoolExecutor(initializer=worker_initializer,
+                                                   initargs=(monitor.records,)) as executor:
         # Submit each function to the process pool
-        futures = [executor.submit(func) for func in functions]
+        futures = [executor.submit(run_job, func.__name__, func) for func in functions]
 
         # Wait for all functions to complete and retrieve their results
         for future in concurrent.futures.as_completed(futures):
@@ -28,8 +36,9 @@ def run_functions_in_process_pool(functions):
 
 
 if __name__ == '__main__':
-    run_functions_in_process_pool([build_ex1,
-                                   build_ex3,
-                                   build_ex4,
-                                   build_ex5,
-                                   build_ex6])
+    # Every simulation of every exercise shares one pool, longest first
+    run_exercises({'ex1': (tasks_ex1, summarize_ex1),
+                   'ex3': (tasks_ex3, summarize_ex3),
+                   'ex4': (tasks_ex4, summarize_ex4),
+                   'ex5': (tasks_ex5, summarize_ex5),
+                   'ex6': (tasks_ex6, summarize_ex6)})
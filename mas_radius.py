@@ -1,8 +1,7 @@
-import itertools
-import math
-
 import numpy as np
 
+from storage import BitVolume, occupied_coordinates
+
 
 def iterate_with_step_integers(x1: int, x2: int, n: int) -> list[int]:
     total_range = x2 - x1
@@ -25,25 +24,45 @@ def iterate_with_step_integers(x1: int, x2: int, n: int) -> list[int]:
 
 def mas_radius(grid: np.array,
                n: int,
-               center_x: int,
-               center_y: int,
+               center_x: int | None,
+               center_y: int | None,
                min_radius: int,
                max_radius: int,
                samples: int,
-               occupied_value: int) -> tuple[list[int], list[int], float]:
-    result = []
-    radii = iterate_with_step_integers(min_radius, max_radius, samples)
-
-    # Calculate the mass for each radius
-    for radius in radii:
-        counter = 0
-        for x, y in itertools.product(range(0, n), repeat=2):
-            if grid[x][y] != occupied_value:
-                continue
-            cur_range = math.sqrt((center_x - x) ** 2 + (center_y - y) ** 2)
-            if cur_range < radius:
-                counter += 1
-        result.append(counter)
+               occupied_value: int,
+               centers: list[tuple[float, float]] = None,
+               radii: list[int] = None,
+               gyration: bool = False) -> tuple[list[int], list[int], float]:
+    """
+    Mass-radius analysis: the number of occupied nodes closer than each radius to the centre, and the
+    slope of log2(mass) against log2(radius), skipping the first radius.
+
+    The squared distances of the occupied nodes are computed and sorted once, so each radius is a
+    binary search. Leaving center_x and center_y as None uses the centroid of the occupied nodes.
+    With several `centers` (for example the seeds) the masses are averaged over them. `radii`
+    replaces the min_radius/max_radius/samples spacing, e.g. with every integer radius. With
+    `gyration` the radius of gyration of the occupied nodes is returned as a fourth value.
+    `grid` may be a lattice array, a memory map or a PackedGrid; it is read a block of rows at a time.
+    """
+    x, y = occupied_coordinates(grid, n, occupied_value)
+    if radii is None:
+        radii = iterate_with_step_integers(min_radius, max_radius, samples)
+    if centers is None:
+        if center_x is None or center_y is None:
+            centers = [(x.mean(), y.mean())]  # Centroid of the cluster
+        else:
+            centers = [(center_x, center_y)]
+
+    # Calculate the mass for each radius: nodes strictly inside, as with cur_range < radius
+    squared_radii = np.square(np.asarray(radii, dtype=float))
+    masses = []
+    for cx, cy in centers:
+        squared_distances = np.sort((x - cx) ** 2 + (y - cy) ** 2)
+        masses.append(np.searchsorted(squared_distances, squared_radii, side='left'))
+    if len(centers) == 1:
+        result = masses[0].tolist()
+    else:
+        result = np.mean(masses, axis=0).tolist()
 
     # Remove the first value for both radii and result to calculate slope
     log2_radii = np.log2(radii[1:])
@@ -52,5 +71,43 @@ def mas_radius(grid: np.array,
     # Perform linear regression to calculate the slope
     slope, _ = np.polyfit(log2_radii, log2_result, 1)
 
+    if gyration:
+        r_gyration = float(np.sqrt(np.mean((x - x.mean()) ** 2 + (y - y.mean()) ** 2)))
+        return radii, result, slope, r_gyration
+
     # Return radii, result, and the calculated slope
     return radii, result, slope
+
+
+def mas_radius_3d(volume,
+                  n: int,
+                  center: tuple[float, float, float] | None,
+                  min_radius: int,
+                  max_radius: int,
+                  samples: int,
+                  occupied_value: int = 2,
+                  radii: list[int] = None,
+                  gyration: bool = False) -> tuple[list[int], list[int], float]:
+    """
+    mas_radius for cubic lattices: `volume` is a BitVolume (the cluster of aggregate_3d) or an
+    (n, n, n) array, and `center` an (x, y, z) point, the centroid of the occupied nodes when None.
+    """
+    if isinstance(volume, BitVolume):
+        x, y, z = volume.coordinates()
+    else:
+        x, y, z = np.nonzero(np.asarray(volume[:n, :n, :n]) == occupied_value)
+    if radii is None:
+        radii = iterate_with_step_integers(min_radius, max_radius, samples)
+    if center is None:
+        center = (x.mean(), y.mean(), z.mean())  # Centroid of the cluster
+
+    # Nodes strictly inside each radius, by binary search in the sorted squared distances
+    squared_distances = np.sort((x - center[0]) ** 2 + (y - center[1]) ** 2 + (z - center[2]) ** 2)
+    result = np.searchsorted(squared_distances, np.square(np.asarray(radii, dtype=float)), side='left').tolist()
+
+    slope, _ = np.polyfit(np.log2(radii[1:]), np.log2(result[1:]), 1)
+
+    if gyration:
+        r_gyration = float(np.sqrt(np.mean((x - x.mean()) ** 2 + (y - y.mean()) ** 2 + (z - z.mean()) ** 2)))
+        return radii, result, slope, r_gyration
+    return radii, result, slope
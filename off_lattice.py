@@ -0,0 +1,208 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from lattice import Boundary
+from spatial_hash import SpatialHash
+from storage import allocate_grid
+from telemetry import Telemetry
+
+STEP_OUT_ATTEMPTS = 8  # Moves a walker inside the cluster gets to step out of it before it is buried
+
+
+class OffLatticeCluster(NamedTuple):
+    """Particle centres of an off-lattice cluster in stick order, seeds first."""
+    x: np.ndarray
+    y: np.ndarray
+    radius: float
+    size: float
+
+    def rasterize(self, n: int) -> np.ndarray:
+        """
+        (n + 2, n + 2) uint8 lattice with value 2 on the cells holding a particle centre, in the
+        layout of aggregate(), so box_count and mas_radius apply with occupied value 2.
+        """
+        grid = allocate_grid(n)
+        scale = n / self.size
+        grid[np.clip((self.x * scale).astype(int), 0, n - 1), np.clip((self.y * scale).astype(int), 0, n - 1)] = 2
+        return grid
+
+
+def _place_particles(index: SpatialHash, size, n_walkers, clearance, normal_distribution=None):
+    """Draws walker positions in the box, at least `clearance` away from the seed particles."""
+    xs, ys = [], []
+    placed = 0
+    while placed < n_walkers:
+        need = n_walkers - placed
+        if normal_distribution is not None:
+            x = np.random.normal(size / 2, normal_distribution, need + 16) % size
+            y = np.random.normal(size / 2, normal_distribution, need + 16) % size
+        else:
+            x, y = np.random.uniform(0, size, (2, need + 16))
+        free = ~index.overlaps(x, y, clearance)
+        xs.append(x[free][:need])
+        ys.append(y[free][:need])
+        placed += xs[-1].size
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def _stick(index: SpatialHash, x, y, contact, chunk: int = 256) -> np.ndarray:
+    """
+    Adds the walkers that made contact in this step to the index, except those overlapping a walker
+    stuck before them in the same step, which stay mobile. Returns the mask of the walkers added.
+    """
+    tolerance = contact * (1 - 1e-9)  # Particles in contact are exactly `contact` apart
+    added = np.zeros(x.size, dtype=bool)
+    for start in range(0, x.size, chunk):
+        cx, cy = x[start:start + chunk], y[start:start + chunk]
+        wx, wy = cx[:, None] - cx, cy[:, None] - cy
+        if index.periodic:
+            wx -= index.size * np.round(wx / index.size)
+            wy -= index.size * np.round(wy / index.size)
+        clash = np.tril(wx * wx + wy * wy < tolerance * tolerance, k=-1).any(axis=1)  # With an earlier walker
+        ok = ~clash & ~index.overlaps(cx, cy, tolerance)  # Or with one added from an earlier chunk
+        index.insert(cx[ok], cy[ok])
+        added[start:start + chunk] = ok
+    return added
+
+
+def aggregate_off_lattice(size: float,
+                          n_walkers: int,
+                          radius: float = 0.5,
+                          step: float = None,
+                          max_iterations: int = None,
+                          save_plot_dir: str = None,
+                          save_plot_name: str = None,
+                          sticky_points: list[tuple[float, float]] | np.ndarray = None,
+                          normal_distribution: float = None,
+                          boundary: Boundary = Boundary.PERIODIC,
+                          stats: dict = None,
+                          progress=None,
+                          telemetry_path: str = None) -> OffLatticeCluster:
+    """
+    Off-lattice diffusion-limited aggregation of disc particles in a square box of side `size`.
+
+    All mobile walkers move at once in uniformly random directions. A walker whose move brings it into
+    contact with a cluster particle (centres 2 * radius apart) is placed at the exact point of contact
+    along the move and joins the cluster. Contact tests go through a SpatialHash, so each walker only
+    looks at the particles of the cells around it. Walkers near the cluster take steps of length `step`
+    (the radius by default); walkers further away jump onto the largest circle the hash guarantees to be
+    free of contacts, where Brownian motion would first leave it. Walkers do not interact with each other:
+    a walker a particle stuck on top of steps out to touch its nearest particle after its next move and
+    sticks there; one that keeps landing inside another particle is buried (left out of the run). Of two
+    overlapping walkers sticking in the same step only one does, so cluster particles never overlap. Progress is
+    reported like aggregate().
+
+    Args:
+        sticky_points: Seed particle centres as (x, y) pairs, the centre of the box by default.
+
+    Returns:
+        OffLatticeCluster: Particle coordinates, with rasterize(n) for box_count and mas_radius.
+    """
+    step = radius if step is None else step
+    contact = 2 * radius
+    telemetry = Telemetry(progress, telemetry_path)
+
+    with telemetry.phase('placement'):
+        index = SpatialHash(size, contact + step, periodic=boundary == Boundary.PERIODIC)
+        if sticky_points is None:
+            sticky_points = [(size / 2, size / 2)]
+        seeds = np.asarray(sticky_points, dtype=float).reshape(-1, 2)
+        index.insert(seeds[:, 0], seeds[:, 1])
+        x, y = _place_particles(index, size, n_walkers, contact, normal_distribution)
+
+    cluster_x, cluster_y = [seeds[:, 0]], [seeds[:, 1]]
+    status = np.ones(n_walkers, dtype=np.uint8)  # 1 mobile, 2 glued, 0 absorbed, 3 buried
+    active = np.arange(n_walkers)  # Compacted index of mobile walkers
+    gap = np.zeros(n_walkers)  # Lower bound on each walker's distance to the cluster as of `checked`
+    checked = np.zeros(n_walkers, dtype=np.int64)  # Index version gap was measured at
+    attempts = np.zeros(n_walkers, dtype=np.uint8)  # Failed steps out of the cluster
+    iteration, n_glued, walker_steps = 0, 0, 0
+
+    while active.size > 0 and (max_iterations is None or iteration < max_iterations):
+        with telemetry.phase('stepping'):
+            walker_steps += active.size
+            x0, y0 = x[active], y[active]
+
+            # Walkers away from the cluster jump onto a circle they cannot leave without a contact
+            length = np.maximum(index.clearance(x0, y0) - contact, step)
+            if boundary != Boundary.PERIODIC:
+                wall = np.minimum(np.minimum(x0, size - x0), np.minimum(y0, size - y0))
+                length = np.maximum(np.minimum(length, wall), step)
+            angle = np.random.uniform(0, 2 * np.pi, active.size)
+            dx, dy = length * np.cos(angle), length * np.sin(angle)
+
+            with telemetry.phase('sticky'):
+                # Walkers still further from the cluster than their move, with nothing stuck within
+                # reach since they were measured, cannot make contact
+                stale = index.version_at(x0, y0) > checked[active]
+                query = np.flatnonzero(stale | (gap[active] <= contact + length))
+                t = np.full(active.size, np.inf)
+                t[query], gap[active[query]] = index.first_contact(x0[query], y0[query], dx[query], dy[query],
+                                                                   contact, nearest=True)
+                checked[active[query]] = index.version
+                buried = query[gap[active[query]] < contact]  # A particle stuck on top of them
+                hit = np.isfinite(t)
+                t[~hit] = 1.0
+                gap[active] -= t * length
+            nx, ny = x0 + t * dx, y0 + t * dy
+
+            if boundary == Boundary.PERIODIC:
+                nx, ny = nx % size, ny % size
+            else:
+                crossed = ~hit & ((nx < 0) | (nx >= size) | (ny < 0) | (ny >= size))
+                if boundary == Boundary.ABSORBING:
+                    status[active[crossed]] = 0
+                nx[crossed], ny[crossed] = x0[crossed], y0[crossed]  # Reflecting: the move is rejected
+
+            # Walkers still inside a particle after their move step out to touch the nearest one and
+            # stick there, as a lattice walker steps off a shared cell onto the cluster's frontier
+            with telemetry.phase('sticky'):
+                wx, wy = index.nearest(nx[buried], ny[buried])
+                distance = np.hypot(wx, wy)
+                inside = (distance < contact) & (distance > 0)
+                buried, scale = buried[inside], contact / distance[inside] - 1
+                ex, ey = nx[buried] + wx[inside] * scale, ny[buried] + wy[inside] * scale
+                if boundary == Boundary.PERIODIC:
+                    ex, ey = ex % size, ey % size
+                else:
+                    kept = (ex >= 0) & (ex < size) & (ey >= 0) & (ey < size)
+                    buried, ex, ey = buried[kept], ex[kept], ey[kept]
+                nx[buried], ny[buried] = ex, ey
+                hit[buried] = True
+            x[active], y[active] = nx, ny
+
+            with telemetry.phase('sticky'):
+                candidates = active[hit]
+                stuck = candidates[_stick(index, x[candidates], y[candidates], contact)]
+                status[stuck] = 2
+                # Stepping out keeps landing inside another particle: the walker is walled in
+                buried = active[buried[status[active[buried]] == 1]]
+                buried = buried[index.overlaps(x[buried], y[buried], contact * (1 - 1e-9))]
+                attempts[buried] += 1
+                status[buried[attempts[buried] >= STEP_OUT_ATTEMPTS]] = 3
+                cluster_x.append(x[stuck])
+                cluster_y.append(y[stuck])
+                n_glued += stuck.size
+        active = active[status[active] == 1]
+        iteration += 1
+
+        if iteration % 100 == 0:
+            telemetry.report(iteration, n_glued, active.size, walker_steps)
+
+    record = telemetry.report(iteration, n_glued, active.size, walker_steps, final=True)
+    telemetry.close()
+    if stats is not None:
+        stats.update(iterations=iteration, glued=n_glued, absorbed=int(np.count_nonzero(status == 0)),
+                     buried=int(np.count_nonzero(status == 3)), phase_seconds=record['phases'])
+
+    cluster = OffLatticeCluster(np.concatenate(cluster_x), np.concatenate(cluster_y), radius, size)
+
+    # Final plot: the particles as discs
+    if save_plot_dir is not None:
+        from plotting import plot_discs  # Only runs that save plots load matplotlib
+        os.makedirs(save_plot_dir, exist_ok=True)
+        plot_discs(cluster.x, cluster.y, contact, size, f'{save_plot_dir}\\{save_plot_name}_end.png')
+
+    return cluster
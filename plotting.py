@@ -0,0 +1,94 @@
+import functools
+
+import numpy as np
+from matplotlib.collections import EllipseCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from lattice import NeighborType
+
+
+HEX_COLORS = np.array([[0, 0, 0, 0], [0, 0, 1, 1], [1, 0, 0, 1]], dtype=float)  # RGBA: empty, walker, cluster
+
+
+@functools.lru_cache(maxsize=None)
+def _hexagon_vertices(n: int) -> np.ndarray:
+    """(n * n, 6, 2) corners of the hexagons of an n x n triangular lattice, odd rows shifted right."""
+    hex_radius = 1  # Radius of each hexagon
+    x_spacing = np.sqrt(3) * hex_radius  # Horizontal distance between hexagon centers
+    y_spacing = 1.5 * hex_radius  # Vertical distance between hexagon centers (staggered)
+    i, j = np.divmod(np.arange(n * n), n)
+    x = j * x_spacing + np.where(i % 2 == 1, x_spacing / 2, 0)
+    y = i * y_spacing
+    # Same corners as RegularPolygon(numVertices=6, orientation=30 degrees)
+    angles = np.pi / 2 + np.radians(30) + 2 * np.pi * np.arange(6) / 6
+    radius = hex_radius * 0.95
+    return np.stack([x[:, None] + radius * np.cos(angles), y[:, None] + radius * np.sin(angles)], axis=-1)
+
+
+@functools.lru_cache(maxsize=4)
+def _hexagon_figure(n: int):
+    """Figure with one persistent collection of n x n hexagons; only the face colours change per plot."""
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    collection = PolyCollection(_hexagon_vertices(n), facecolors=HEX_COLORS[np.zeros(n * n, dtype=int)],
+                                edgecolors='k', linewidths=0.5)
+    ax.add_collection(collection)
+
+    # Set limits for x and y to match the grid
+    x_spacing, y_spacing = np.sqrt(3), 1.5
+    ax.set_xlim(-x_spacing / 2, n * x_spacing)
+    ax.set_ylim(-y_spacing / 2, n * y_spacing)
+
+    ax.set_aspect('equal')
+    ax.set_axis_off()  # Hide the axes for a cleaner look
+    return fig, ax, collection
+
+
+def plot_hexagonal(grid, save_plot_name=None, save_plot_dir=None, iteration=None):
+    """
+    Optimized version of plotting the grid with a hexagonal layout.
+    The hexagon geometry and figure are built once per lattice size; a plot only gathers the face
+    colours (red cluster, blue walkers, transparent empty cells) from the grid values.
+    """
+    n, _ = grid.shape
+    fig, ax, collection = _hexagon_figure(n)
+    values = np.where((grid == 1) | (grid == 2), grid, 0).ravel()
+    collection.set_facecolor(HEX_COLORS[values])
+
+    # Save the plot if save_plot_name is provided
+    if save_plot_name and save_plot_dir:
+        if iteration is not None:
+            # Add iteration number to filename for video frames
+            save_path = f'{save_plot_dir}\\{save_plot_name}_iter_{iteration:04d}.png'
+        else:
+            save_path = f'{save_plot_dir}\\{save_plot_name}.png'
+        ax.set_title(f'{save_plot_name}')
+        fig.savefig(save_path)
+
+
+def plot_grid(grid, neighbor_type, save_plot_dir, save_plot_name):
+    """Saves a lattice as {save_plot_dir}\\{save_plot_name}.png, as hexagons on the triangular lattice."""
+    if neighbor_type in (NeighborType.SIX_NEIGHBORS_TRIANGULAR, NeighborType.SIX_NEIGHBORS_TRIANGULAR.name):
+        plot_hexagonal(grid, save_plot_name=save_plot_name, save_plot_dir=save_plot_dir)
+    else:
+        plot_image(grid, f'{save_plot_dir}\\{save_plot_name}.png')
+
+
+def plot_image(image, path: str):
+    """Saves a 2D array as a pixel image."""
+    fig = Figure()
+    ax = fig.subplots()
+    ax.imshow(image, interpolation="nearest")  # Display aggregate as pixel image
+    fig.savefig(path)
+
+
+def plot_discs(x, y, diameter: float, size: float, path: str):
+    """Saves discs of the given diameter centred on (x, y) in a square box of side `size`."""
+    fig = Figure()
+    ax = fig.subplots()
+    ax.add_collection(EllipseCollection(diameter, diameter, 0, units='xy', offsets=np.c_[x, y],
+                                        transOffset=ax.transData))
+    ax.set_xlim(0, size)
+    ax.set_ylim(0, size)
+    ax.set_aspect('equal')
+    fig.savefig(path)
@@ -0,0 +1,55 @@
+import argparse
+import os
+
+
+from event_log import EventLogReader
+from lattice import NeighborType
+from plotting import plot_hexagonal, plot_image
+from video_creator import VideoSink
+
+
+def render_video(log_path: str, output_path: str, fps: int = 60, stride: int = 1, min_size: int = 512,
+                 title: str = None) -> None:
+    """
+    Renders a logged simulation to a video, one frame every `stride` iterations plus the final state.
+
+    Args:
+        log_path (str): EventLogWriter directory.
+        output_path (str): The path where the video will be saved (e.g., "output/video.mp4").
+        fps (int): Frames per second for the video.
+        stride (int): Iterations between frames.
+        min_size (int): Smallest lattice width in pixels.
+        title (str): Text drawn above the lattice, if any.
+    """
+    log = EventLogReader(log_path)
+    iterations = list(range(0, log.iterations + 1, stride))
+    if iterations[-1] != log.iterations:
+        iterations.append(log.iterations)
+    hexagonal = log.neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR.name
+    with VideoSink(output_path, log.n, fps=fps, title=title, hexagonal=hexagonal, min_size=min_size) as video:
+        for _, grid in log.frames(iterations):
+            video.write(grid)
+
+
+def render_plot(log_path: str, iteration: int, save_plot_dir: str, save_plot_name: str) -> None:
+    """Saves the lattice at one iteration with the same plot aggregate() uses."""
+    log = EventLogReader(log_path)
+    grid = log.grid_at(iteration)
+    os.makedirs(save_plot_dir, exist_ok=True)
+    if log.neighbor_type == NeighborType.SIX_NEIGHBORS_TRIANGULAR.name:
+        plot_hexagonal(grid, save_plot_name=save_plot_name, save_plot_dir=save_plot_dir, iteration=iteration)
+    else:
+        plot_image(grid, os.path.join(save_plot_dir, f'{save_plot_name}_iter_{iteration:04d}.png'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render a logged aggregation offline.')
+    parser.add_argument('log_path', help='Event log directory written by aggregate(event_log=...).')
+    parser.add_argument('output_path', help='Video file to write.')
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--stride', type=int, default=1, help='Iterations between frames.')
+    parser.add_argument('--size', type=int, default=512, help='Smallest lattice width in pixels.')
+    parser.add_argument('--title', default=None)
+    args = parser.parse_args()
+    render_video(args.log_path, args.output_path, fps=args.fps, stride=args.stride, min_size=args.size,
+                 title=args.title)
@@ -0,0 +1,145 @@
+import contextlib
+import hashlib
+import os
+import time
+import zipfile
+from enum import Enum
+
+import numpy as np
+
+LOCK_TIMEOUT = 60.0  # Seconds after which an eviction lock left by a crashed process is taken over
+
+
+def _digest(value, h):
+    # Feeds a canonical encoding of nested inputs to the hash: equal inputs always give equal bytes
+    if isinstance(value, Enum):
+        h.update(f'enum:{type(value).__name__}.{value.name};'.encode())
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(f'array:{value.dtype.str}{value.shape};'.encode())
+        h.update(value.tobytes())
+    elif isinstance(value, dict):
+        h.update(f'dict:{len(value)};'.encode())
+        for key in sorted(value):
+            _digest(key, h)
+            _digest(value[key], h)
+    elif isinstance(value, (list, tuple)):  # NamedTuples such as Stencil included
+        h.update(f'seq:{len(value)};'.encode())
+        for item in value:
+            _digest(item, h)
+    elif isinstance(value, np.generic):
+        _digest(value.item(), h)
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        h.update(f'{type(value).__name__}:{value!r};'.encode())
+    else:
+        raise TypeError(f"Cannot hash cache input of type {type(value).__name__}.")
+
+
+class ResultCache:
+    """
+    On-disk cache of simulation results, one compressed .npz file per entry named after the SHA-256
+    of the inputs that determine the result (see key()).
+
+    Entries are written to a temporary file and renamed into place, so readers never see a partial
+    entry. Reads refresh the entry's modification time, and once the entries exceed `max_bytes` the
+    least recently used ones are deleted. With `shared`, several processes (e.g. the workers of a
+    process pool) may use the same directory: temporary files are per process, eviction runs under a
+    lock file, and entries deleted by another process are treated as misses.
+
+    Args:
+        directory (str): Cache directory, created on the first write.
+        max_bytes (int): Size bound of all entries, None for unbounded.
+        shared (bool): Safe for concurrent writers.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = None, shared: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.shared = shared
+
+    @staticmethod
+    def key(**inputs) -> str:
+        """Hex digest of the inputs: scalars, strings, Enums, arrays and nested lists, tuples and dicts."""
+        h = hashlib.sha256()
+        _digest(inputs, h)
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key: str) -> dict | None:
+        """The entry stored under `key`, or None. 0-d arrays come back as Python scalars."""
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name].item() if data[name].ndim == 0 else data[name] for name in data.files}
+            os.utime(path)  # Most recently used
+        except (OSError, ValueError, zipfile.BadZipFile):  # Missing, evicted meanwhile or unreadable
+            return None
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """Stores a dict of arrays and scalars under `key`, then evicts down to `max_bytes`."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp' if self.shared else f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:  # A file object keeps np.savez_compressed from appending .npz
+            np.savez_compressed(f, **entry)
+        os.replace(tmp_path, path)  # Concurrent writers of one key write the same result; either rename wins
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """(last use, size in bytes, path) of every entry, least recently used first."""
+        entries = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.npz'):
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((info.st_mtime, info.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        """Bytes taken by all entries."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: int) -> None:
+        """Deletes the least recently used entries until they take at most `max_bytes`."""
+        if not os.path.isdir(self.directory):
+            return
+        lock = os.path.join(self.directory, 'evict.lock')
+        if self.shared:
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock) >= LOCK_TIMEOUT:
+                        os.remove(lock)  # Left by a crashed process; the next write evicts
+                except OSError:
+                    pass
+                return  # Another process is evicting
+        try:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:  # Already gone, or open elsewhere on Windows
+                    continue
+                total -= size
+        finally:
+            if self.shared:
+                with contextlib.suppress(FileNotFoundError):  # Taken over as stale by another process
+                    os.remove(lock)
+
+    def clear(self) -> None:
+        """Deletes every entry."""
+        self.evict(0)
+
+
+EXERCISE_CACHE = ResultCache('target\\cache', max_bytes=2 ** 30, shared=True)  # Shared by the exercises and their pool
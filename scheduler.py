@@ -0,0 +1,120 @@
+import concurrent.futures
+import multiprocessing
+import os
+from collections import deque
+from typing import Callable, NamedTuple
+
+from telemetry import ProgressMonitor, run_job, worker_initializer
+
+
+class Task(NamedTuple):
+    """
+    One unit of work for the shared pool. `cost` is the expected relative run time, used to start
+    the longest tasks first; any consistent unit works (the exercises use walker counts).
+    """
+    name: str
+    func: Callable
+    args: tuple = ()
+    kwargs: dict = {}
+    cost: float = 1.0
+
+
+def run_serially(tasks: list[Task]) -> dict:
+    """Runs tasks one after another in this process and returns {task.name: result}."""
+    return {task.name: task.func(*task.args, **task.kwargs) for task in tasks}
+
+
+def _job_name(name) -> str:
+    return '/'.join(map(str, name)) if isinstance(name, tuple) else str(name)
+
+
+def run_tasks(tasks: list[Task], max_workers: int = None, on_done: Callable = None,
+              on_progress: Callable = None) -> dict:
+    """
+    Runs all tasks in one process pool sized to the machine and returns {task.name: result}.
+
+    Tasks are handed out longest expected first, and only as workers become free: every idle worker
+    takes the next pending task, so no core waits on a queue that belongs to another. That is greedy
+    longest-processing-time scheduling, the shared-queue equivalent of work stealing.
+    Progress records of the simulations are sent back from the workers tagged with the task name.
+
+    Parameters:
+    tasks (list): Tasks with unique names.
+    max_workers (int): Pool size, defaults to the number of CPUs.
+    on_done (callable): Called in this process as on_done(task, result) when each task finishes.
+    on_progress (callable): Called in this process with every progress record, defaults to a one-line
+        print per record.
+    """
+    pending = deque(sorted(tasks, key=lambda task: task.cost, reverse=True))
+    max_workers = max_workers or os.cpu_count() or 1
+    results = {}
+
+    with multiprocessing.Manager() as manager, ProgressMonitor(manager.Queue(), on_progress) as monitor, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=worker_initializer,
+                                                   initargs=(monitor.records,)) as executor:
+        running = {}
+
+        def submit_next():
+            task = pending.popleft()
+            running[executor.submit(run_job, _job_name(task.name), task.func, *task.args, **task.kwargs)] = task
+
+        for _ in range(min(max_workers, len(pending))):
+            submit_next()
+
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                if pending:
+                    submit_next()  # Keep the freed worker busy before doing any bookkeeping
+                try:
+                    results[task.name] = future.result()
+                except Exception as e:
+                    print(f"Task {task.name} raised an exception: {e}")
+                    results[task.name] = e
+                if on_done is not None:
+                    on_done(task, results[task.name])
+
+    return results
+
+
+def run_exercises(exercises: dict[str, tuple[Callable, Callable]], max_workers: int = None) -> None:
+    """
+    Flattens the tasks of every exercise into one pool and calls each exercise's summary as soon as
+    all of its own tasks are done.
+
+    Parameters:
+    exercises (dict): Exercise name -> (make_tasks, summarize). make_tasks() returns a list of Task;
+        summarize(results) receives {task.name: result} for that exercise only.
+    """
+    tasks = []
+    remaining = {}
+    for exercise, (make_tasks, _) in exercises.items():
+        exercise_tasks = make_tasks()
+        remaining[exercise] = {task.name for task in exercise_tasks}
+        tasks.extend(task._replace(name=(exercise, task.name)) for task in exercise_tasks)
+    collected = {exercise: {} for exercise in exercises}
+
+    def summarize_when_complete(exercise):
+        results = collected[exercise]
+        failed = [name for name, result in results.items() if isinstance(result, Exception)]
+        if failed:
+            print(f"Skipping the {exercise} summary, failed tasks: {failed}")
+            return
+        try:
+            exercises[exercise][1](results)
+            print(f"Exercise {exercise} completed.")
+        except Exception as e:
+            print(f"Exercise {exercise} summary raised an exception: {e}")
+
+    def on_done(task, result):
+        exercise, name = task.name
+        collected[exercise][name] = result
+        remaining[exercise].discard(name)
+        if not remaining[exercise]:
+            summarize_when_complete(exercise)
+
+    for exercise in exercises:  # Exercises without tasks only have a summary
+        if not remaining[exercise]:
+            summarize_when_complete(exercise)
+    run_tasks(tasks, max_workers=max_workers, on_done=on_done)
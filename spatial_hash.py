@@ -0,0 +1,189 @@
+import numpy as np
+
+MAX_LEVELS = 6  # Coarsest clearance level: blocks of 2^6 cells
+
+
+class SpatialHash:
+    """
+    Uniform-grid index of the particles of an off-lattice cluster in a square box of side `size`.
+
+    The box is split into square cells at least `reach` wide, so every particle within `reach` of a point
+    lies in the 3 x 3 cells around it. Each cell keeps the coordinates of its particles in a fixed
+    number of slots (doubled when a cell overflows). For every level j, `near[j]` flags the blocks of
+    2^j x 2^j cells with a particle in their 3 x 3 neighbourhood of blocks, so a point whose block is
+    clear is at least one block width away from the cluster. Each cell also keeps the number of levels
+    its blocks are clear at, updated as blocks turn near, so clearance() is a single lookup. Every insert
+    bumps `version` and stamps the 3 x 3 cells around the cells it fills, so callers can tell whether
+    what they learnt about a point still holds. With `periodic` distances use the minimum image;
+    otherwise the wrapped neighbour cells simply hold particles too far away to matter.
+
+    Args:
+        size (float): Side of the box; coordinates are in [0, size).
+        reach (float): Largest distance queried, e.g. contact distance plus step length.
+        periodic (bool): The box wraps around.
+        slots (int): Initial particles per cell.
+    """
+
+    def __init__(self, size: float, reach: float, periodic: bool = True, slots: int = 8):
+        if size < reach:
+            raise ValueError(f"Box of side {size} is smaller than the query reach {reach}.")
+        base = int(size // reach)
+        levels = 0
+        while levels < MAX_LEVELS and 3 * 2 ** (levels + 1) <= base:
+            levels += 1
+        self.size = size
+        self.periodic = periodic
+        self.n_cells = base // 2 ** levels * 2 ** levels  # Blocks of every level tile the box exactly
+        self.cell_size = size / self.n_cells
+        self._cells_per_unit = self.n_cells / size
+        self.counts = np.zeros((self.n_cells, self.n_cells), dtype=np.int32)
+        self.px = np.full((self.n_cells, self.n_cells, slots), np.nan)
+        self.py = np.full((self.n_cells, self.n_cells, slots), np.nan)
+        self.near = [np.zeros((self.n_cells >> j, self.n_cells >> j), dtype=bool) for j in range(levels + 1)]
+        self._clear_levels = np.full((self.n_cells, self.n_cells), levels + 1, dtype=np.int8)
+        self._clear_distance = np.r_[0.0, 2.0 ** np.arange(levels + 1) * self.cell_size]  # By clear levels
+        self._around = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        self.version = 0
+        self._stamps = np.zeros((self.n_cells, self.n_cells), dtype=np.int64)  # Version of the last insert around
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def cell(self, x, y):
+        """Cell coordinates of points."""
+        cx = np.clip((np.asarray(x) * self._cells_per_unit).astype(np.int64), 0, self.n_cells - 1)
+        cy = np.clip((np.asarray(y) * self._cells_per_unit).astype(np.int64), 0, self.n_cells - 1)
+        return cx, cy
+
+    def insert(self, x, y):
+        """Adds particles, given as coordinate arrays."""
+        x, y = np.atleast_1d(x).astype(float), np.atleast_1d(y).astype(float)
+        if x.size == 0:
+            return
+        cx, cy = self.cell(x, y)
+        key = cx * self.n_cells + cy
+        order = np.argsort(key, kind='stable')
+        key, x, y, cx, cy = key[order], x[order], y[order], cx[order], cy[order]
+        starts = np.r_[0, np.flatnonzero(key[1:] != key[:-1]) + 1]
+        rank = np.arange(key.size) - np.repeat(starts, np.diff(np.r_[starts, key.size]))
+        slot = self.counts[cx, cy] + rank
+        while slot.max() >= self.px.shape[2]:  # Grow every cell's slots
+            pad = np.full(self.px.shape, np.nan)
+            self.px, self.py = np.concatenate([self.px, pad], axis=2), np.concatenate([self.py, pad], axis=2)
+        self.px[cx, cy, slot], self.py[cx, cy, slot] = x, y
+        np.add.at(self.counts, (cx, cy), 1)
+        around = self._around
+        self.version += 1
+        self._stamps[(cx[starts, None] + around[:, 0]) % self.n_cells,
+                     (cy[starts, None] + around[:, 1]) % self.n_cells] = self.version
+        for j, near in enumerate(self.near):
+            blocks = near.shape[0]
+            bx = (((cx[starts] >> j)[:, None] + around[:, 0]) % blocks).ravel()
+            by = (((cy[starts] >> j)[:, None] + around[:, 1]) % blocks).ravel()
+            fresh = ~near[bx, by]
+            new = np.unique(bx[fresh] * blocks + by[fresh])
+            if new.size == 0:
+                continue
+            bx, by = np.divmod(new, blocks)
+            near[bx, by] = True
+            # Cells of a block turning near are clear at the finer levels only
+            cells = self._clear_levels.reshape(blocks, 1 << j, blocks, 1 << j)
+            cells[bx, :, by, :] = np.minimum(cells[bx, :, by, :], j)
+
+    def _pairs(self, x, y, cx, cy):
+        # Every (point, particle) pair with the particle in the 3 x 3 cells around the point: the owning
+        # point, ordered, the offsets from the particle to the point and the start of each point's pairs.
+        # One flat gather per coordinate; a neighbour cell across the periodic edge shifts the point by
+        # the box side instead, so the pairs need no minimum-image rounding
+        n_cells, slots = self.n_cells, self.px.shape[2]
+        rx, ry = cx[:, None] + self._around[:, 0], cy[:, None] + self._around[:, 1]
+        gx, gy = rx % n_cells, ry % n_cells
+        cell = (gx * n_cells + gy).ravel()
+        counts = self.counts.reshape(-1)[cell]
+        first = np.cumsum(counts) - counts
+        index = np.repeat(cell * slots - first, counts) + np.arange(first[-1] + counts[-1])
+        ox, oy = np.repeat(x, rx.shape[1]), np.repeat(y, ry.shape[1])
+        if self.periodic:
+            ox = ox - (rx - gx).ravel() // n_cells * self.size
+            oy = oy - (ry - gy).ravel() // n_cells * self.size
+        wx = np.repeat(ox, counts) - self.px.reshape(-1)[index]
+        wy = np.repeat(oy, counts) - self.py.reshape(-1)[index]
+        per_point = counts.reshape(rx.shape).sum(axis=1)
+        owner = np.repeat(np.arange(x.size), per_point)
+        return owner, wx, wy, np.cumsum(per_point) - per_point, per_point > 0
+
+    def is_near(self, x, y) -> np.ndarray:
+        """True for points with a particle in their 3 x 3 cells."""
+        return self._clear_levels[self.cell(x, y)] == 0
+
+    def version_at(self, x, y) -> np.ndarray:
+        """Version of the last insert with particles within reach of the points, 0 before any."""
+        return self._stamps[self.cell(x, y)]
+
+    def clearance(self, x, y) -> np.ndarray:
+        """Distance below which the points are guaranteed to have no particle, 0 for points near one."""
+        return self._clear_distance[self._clear_levels[self.cell(x, y)]]
+
+    def overlaps(self, x, y, distance: float) -> np.ndarray:
+        """True for points closer than `distance` to a particle."""
+        x, y = np.atleast_1d(x).astype(float), np.atleast_1d(y).astype(float)
+        result = np.zeros(x.size, dtype=bool)
+        cx, cy = self.cell(x, y)
+        near = np.flatnonzero(self._clear_levels[cx, cy] == 0)
+        if near.size:
+            owner, wx, wy, _, _ = self._pairs(x[near], y[near], cx[near], cy[near])
+            result[near[owner[wx * wx + wy * wy < distance * distance]]] = True
+        return result
+
+    def nearest(self, x, y):
+        """Offsets (wx, wy) from each point's nearest particle in its 3 x 3 cells to the point, nan for none."""
+        x, y = np.atleast_1d(x).astype(float), np.atleast_1d(y).astype(float)
+        wx, wy = np.full(x.size, np.nan), np.full(x.size, np.nan)
+        cx, cy = self.cell(x, y)
+        near = np.flatnonzero(self._clear_levels[cx, cy] == 0)
+        if near.size:
+            owner, px, py, starts, paired = self._pairs(x[near], y[near], cx[near], cy[near])
+            d2 = px * px + py * py
+            first = starts[paired]
+            best = np.repeat(np.minimum.reduceat(d2, first), np.diff(np.r_[first, d2.size]))
+            closest = np.flatnonzero(d2 == best)
+            owners, pick = np.unique(owner[closest], return_index=True)  # One per point on ties
+            wx[near[owners]], wy[near[owners]] = px[closest[pick]], py[closest[pick]]
+        return wx, wy
+
+    def first_contact(self, x, y, dx, dy, distance: float, nearest: bool = False):
+        """
+        Fraction t in [0, 1] of the moves (x, y) -> (x + dx, y + dy) at which the points first come
+        within `distance` of a particle, inf for moves that stay clear. Points that already overlap a
+        particle (one stuck on top of them) get inf too; nearest() tells how to step out of it.
+        The moves must be shorter than the hash's reach minus `distance`. With `nearest`, also returns
+        a lower bound on the distance from each point to its nearest particle, exact up to the cell size.
+        """
+        t = np.full(np.size(x), np.inf)
+        cx, cy = self.cell(x, y)
+        levels = self._clear_levels[cx, cy]
+        near = np.flatnonzero(levels == 0)
+        gap = self._clear_distance[levels] if nearest else None
+        if near.size == 0:
+            return (t, gap) if nearest else t
+        owner, wx, wy, starts, paired = self._pairs(x[near], y[near], cx[near], cy[near])
+        ddx, ddy = dx[near][owner], dy[near][owner]
+        # |w + t d|^2 = distance^2, smallest root
+        a = ddx * ddx + ddy * ddy
+        b = wx * ddx + wy * ddy
+        c = wx * wx + wy * wy - distance * distance
+        with np.errstate(invalid='ignore', divide='ignore'):
+            root = (-b - np.sqrt(b * b - a * c)) / a
+        root = np.where((root >= -1e-9) & (root <= 1), np.maximum(root, 0.0), np.inf)
+        root[c < -1e-9 * distance * distance] = -np.inf  # Overlapping
+        first = np.minimum.reduceat(root, starts[paired]) if owner.size else root
+        first[first == -np.inf] = np.inf
+        t[near[paired]] = first
+        if not nearest:
+            return t
+        # Particles outside the 3 x 3 cells are at least a cell away
+        gap[near] = self.cell_size
+        if owner.size:
+            closest = np.sqrt(np.maximum(np.minimum.reduceat(c, starts[paired]) + distance * distance, 0.0))
+            gap[near[paired]] = np.minimum(closest, self.cell_size)
+        return t, gap
@@ -0,0 +1,192 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+
+def allocate_array(shape, dtype, path: str = None) -> np.ndarray:
+    """Zeroed array, or with `path` a zeroed .npy memory map."""
+    if path is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+
+def allocate_grid(n: int, path: str = None) -> np.ndarray:
+    """
+    Zeroed (n + 2, n + 2) lattice with one uint8 per cell (0 empty, 1 walker, 2 cluster). With `path`
+    the lattice is a .npy memory map, so lattices larger than RAM live on disk.
+    """
+    return allocate_array((n + 2, n + 2), np.uint8, path)
+
+
+def sidecar_path(path: str, name: str) -> str:
+    """Path of the .npy file for array `name` next to the lattice memory map at `path`, None without one."""
+    if path is None:
+        return None
+    return f'{os.path.splitext(path)[0]}_{name}.npy'
+
+
+def count_value(grid, n: int, value: int, rows_per_chunk: int = 1024) -> int:
+    """Number of cells of the [0:n, 0:n] block holding the value, a block of rows at a time."""
+    return sum(int(np.count_nonzero(np.asarray(grid[start:min(start + rows_per_chunk, n), :n]) == value))
+               for start in range(0, n, rows_per_chunk))
+
+
+def sample_free_cells(n_walkers: int, draw, occupied) -> np.ndarray:
+    """
+    Rejection-samples `n_walkers` distinct flat cell indices. draw(size) returns candidate indices,
+    and candidates where occupied(candidates) is True, or already taken, are rejected. Batches are a
+    quarter larger than the cells still needed, so memory stays O(n_walkers). The cells come in
+    draw order.
+    """
+    cells = [np.zeros(0, dtype=np.int64)]
+    taken = cells[0]  # Sorted cells placed so far
+    while taken.size < n_walkers:
+        need = n_walkers - taken.size
+        candidates = draw(need + need // 4 + 16)
+        candidates = candidates[~occupied(candidates) & ~np.isin(candidates, taken)]
+        _, first = np.unique(candidates, return_index=True)
+        candidates = candidates[np.sort(first)][:need]  # Drop duplicates, keep the draw order
+        taken = np.union1d(taken, candidates)
+        cells.append(candidates)
+    return np.concatenate(cells)
+
+
+def place_walkers(grid, n, n_walkers, normal_distribution=None, rows_per_chunk: int = 1024) -> np.ndarray:
+    """
+    Draws distinct free cells for the walkers, as flat indices i * n + j.
+    Candidates are drawn uniformly, or around the centre when normal_distribution is given, and
+    rejection-sampled (sample_free_cells). The grid is only read at the candidates, so a memory-mapped
+    lattice is never loaded. Dense uniform placements fall back to a permutation of the free cells.
+    """
+    if normal_distribution is None and n_walkers > count_value(grid, n, 0, rows_per_chunk) // 2:
+        free = [start * n + np.flatnonzero(np.asarray(grid[start:min(start + rows_per_chunk, n), :n]) == 0)
+                for start in range(0, n, rows_per_chunk)]
+        return np.random.permutation(np.concatenate(free))[:n_walkers]
+
+    center = n // 2
+
+    def draw(size):
+        if normal_distribution is None:
+            return np.random.randint(n * n, size=size)
+        # Truncate towards zero like int() and wrap around the lattice
+        cx = np.random.normal(center, normal_distribution, size).astype(int) % n
+        cy = np.random.normal(center, normal_distribution, size).astype(int) % n
+        return cx * n + cy
+
+    return sample_free_cells(n_walkers, draw, lambda cells: grid[cells // n, cells % n] != 0)
+
+
+class PackedGrid(NamedTuple):
+    """Cluster and walker bits of the [0:n, 0:n] block of a lattice, packed 8 cells per byte along rows."""
+    n: int
+    cluster: np.ndarray
+    walkers: np.ndarray
+
+    def plane(self, value: int) -> np.ndarray:
+        """(n, n) bool mask of the cells holding the value (1 walkers, 2 cluster)."""
+        bits = {1: self.walkers, 2: self.cluster}.get(value)
+        if bits is None:
+            return np.zeros((self.n, self.n), dtype=bool)
+        return np.unpackbits(bits, axis=1, count=self.n).view(bool)
+
+    def unpack(self, out: np.ndarray = None, rows_per_chunk: int = 1024) -> np.ndarray:
+        """Back to the (n + 2, n + 2) uint8 lattice, written into `out` (e.g. a memory map) if given."""
+        n = self.n
+        grid = allocate_grid(n) if out is None else out
+        for start in range(0, n, rows_per_chunk):
+            walkers = np.unpackbits(self.walkers[start:start + rows_per_chunk], axis=1, count=n)
+            cluster = np.unpackbits(self.cluster[start:start + rows_per_chunk], axis=1, count=n)
+            grid[start:start + walkers.shape[0], :n] = walkers + 2 * cluster
+        return grid
+
+
+def pack_grid(grid, n: int, rows_per_chunk: int = 1024) -> PackedGrid:
+    """Packs the cluster and walker planes of a lattice, a block of rows at a time."""
+    cluster = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+    walkers = np.zeros_like(cluster)
+    for start in range(0, n, rows_per_chunk):
+        rows = np.asarray(grid[start:min(start + rows_per_chunk, n), :n])
+        cluster[start:start + rows.shape[0]] = np.packbits(rows == 2, axis=1)
+        walkers[start:start + rows.shape[0]] = np.packbits(rows == 1, axis=1)
+    return PackedGrid(n, cluster, walkers)
+
+
+def occupied_plane(grid, n: int, value: int) -> np.ndarray:
+    """(n, n) bool mask of the cells holding the value, from a lattice array, memory map or PackedGrid."""
+    if isinstance(grid, PackedGrid):
+        return grid.plane(value)
+    return np.asarray(grid[:n, :n]) == value
+
+
+def occupied_coordinates(grid, n: int, value: int, rows_per_chunk: int = 1024) -> tuple[np.ndarray, np.ndarray]:
+    """Row and column indices of the cells holding the value, reading the lattice a block of rows at a time."""
+    if isinstance(grid, PackedGrid) and value not in (1, 2):
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    xs, ys = [], []
+    for start in range(0, n, rows_per_chunk):
+        if isinstance(grid, PackedGrid):
+            bits = grid.walkers if value == 1 else grid.cluster
+            rows = np.unpackbits(bits[start:start + rows_per_chunk], axis=1, count=n).view(bool)
+        else:
+            rows = np.asarray(grid[start:min(start + rows_per_chunk, n), :n]) == value
+        x, y = np.nonzero(rows)
+        xs.append(x + start)
+        ys.append(y)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class BitVolume:
+    """
+    Bit set over an n x n x n cubic lattice, 8 cells per byte along the last axis (little-endian bit
+    order), so a 512^3 lattice takes 16 MiB. With `path` the bits are a .npy memory map.
+    """
+
+    def __init__(self, n: int, path: str = None):
+        self.n = n
+        shape = (n, n, (n + 7) // 8)
+        if path is None:
+            self.bits = np.zeros(shape, dtype=np.uint8)
+        else:
+            self.bits = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape)
+        self._flat = self.bits.reshape(-1)
+
+    def _locate(self, x, y, z):
+        z = np.asarray(z)
+        byte = (np.asarray(x, dtype=np.int64) * self.n + y) * self.bits.shape[2] + (z >> 3)
+        return byte, np.left_shift(1, z & 7).astype(np.uint8)
+
+    def get(self, x, y, z) -> np.ndarray:
+        """True for the cells (coordinate arrays) whose bit is set."""
+        byte, mask = self._locate(x, y, z)
+        return (self._flat[byte] & mask) != 0
+
+    def set(self, x, y, z):
+        """Sets the bits of the cells (coordinate arrays); repeated cells are fine."""
+        byte, mask = self._locate(x, y, z)
+        np.bitwise_or.at(self._flat, byte, mask)
+
+    def count(self, slabs_per_chunk: int = 64) -> int:
+        return int(sum(_POPCOUNT[self.bits[start:start + slabs_per_chunk]].sum(dtype=np.int64)
+                       for start in range(0, self.n, slabs_per_chunk)))
+
+    def slab(self, start: int, stop: int) -> np.ndarray:
+        """(stop - start, n, n) bool block of x-slabs."""
+        return np.unpackbits(self.bits[start:stop], axis=2, count=self.n, bitorder='little').view(bool)
+
+    def coordinates(self, slabs_per_chunk: int = 64) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """x, y and z of the set cells, unpacking a block of slabs at a time."""
+        xs, ys, zs = [], [], []
+        for start in range(0, self.n, slabs_per_chunk):
+            x, y, z = np.nonzero(self.slab(start, min(start + slabs_per_chunk, self.n)))
+            xs.append(x + start)
+            ys.append(y)
+            zs.append(z)
+        return np.concatenate(xs), np.concatenate(ys), np.concatenate(zs)
+
+    def projection(self) -> np.ndarray:
+        """(n, n) bool mask of the (x, y) columns holding a set cell."""
+        return (self.bits != 0).any(axis=2)
@@ -0,0 +1,156 @@
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable
+
+_reporter = None  # Process-wide progress callback used when aggregate() is given none
+_job = None  # Name of the job running in this process, set by run_job()
+
+
+def print_progress(record: dict) -> None:
+    """The classic progress line, printed every 100 iterations."""
+    if not record['final']:
+        print("iteration {0}, glued walkers {1}.".format(record['iteration'], record['glued']))
+
+
+def set_reporter(reporter: Callable = None) -> None:
+    """Sets the progress callback for every simulation in this process (None restores the print)."""
+    global _reporter
+    _reporter = reporter
+
+
+def run_job(job: str, func: Callable, *args, **kwargs):
+    """Runs func(*args, **kwargs) with its progress records tagged with the job name."""
+    global _job
+    _job = job
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _job = None
+
+
+class Telemetry:
+    """
+    Progress records and per-phase timings of one simulation.
+
+    Phases are timed with `with telemetry.phase(name):`; nested phases are exclusive, so time spent in
+    'sticky' inside 'stepping' is only counted once. report() builds a record with the iteration, glued
+    and mobile counts, walker steps per second since the previous record and the phase totals, then
+    passes it to the progress callback and appends it to the JSON-lines file, if any.
+
+    Args:
+        progress (callable): Called with every record, defaults to the process-wide reporter or the
+            classic print.
+        jsonl_path (str): File that receives one JSON record per line.
+    """
+
+    def __init__(self, progress: Callable = None, jsonl_path: str = None):
+        self.progress = progress or _reporter or print_progress
+        self.seconds = {}
+        self.sources = []  # Objects with timings() -> dict, e.g. background video encoders
+        self._stack = []
+        self._started = time.perf_counter()
+        self._last = (self._started, 0)
+        self._file = open(jsonl_path, 'a') if jsonl_path else None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        entry = [time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[0]
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - entry[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def phases(self) -> dict:
+        phases = dict(self.seconds)
+        for source in self.sources:
+            for name, seconds in source.timings().items():
+                phases[name] = phases.get(name, 0.0) + seconds
+        return phases
+
+    def report(self, iteration: int, glued: int, mobile: int, walker_steps: int, final: bool = False) -> dict:
+        now = time.perf_counter()
+        last_time, last_steps = self._last
+        self._last = (now, walker_steps)
+        iteration, glued, mobile, walker_steps = int(iteration), int(glued), int(mobile), int(walker_steps)
+        record = {'iteration': iteration, 'glued': glued, 'mobile': mobile, 'walker_steps': walker_steps,
+                  'steps_per_second': (walker_steps - last_steps) / max(now - last_time, 1e-9),
+                  'elapsed': now - self._started, 'phases': self.phases(), 'final': final}
+        if _job is not None:
+            record['job'] = _job
+        self.progress(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+        return record
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class QueueReporter:
+    """Progress callback that forwards records to another process through a (Manager) queue."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __call__(self, record: dict):
+        self.records.put(record)
+
+
+def worker_initializer(records) -> None:
+    """
+    Process-pool initializer: progress of every simulation in the worker goes to `records`, and
+    matplotlib, if a job loads it, uses the non-interactive Agg backend.
+    """
+    os.environ['MPLBACKEND'] = 'Agg'
+    set_reporter(QueueReporter(records))
+
+
+class ProgressMonitor:
+    """
+    Prints the records sent by pool workers from one thread of the parent process, one line per record
+    tagged with its job, so parallel runs don't interleave their prints.
+    """
+
+    def __init__(self, records, on_record: Callable = None):
+        self.records = records
+        self.on_record = on_record or self.print_record
+        self.latest = {}  # Last record per job
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+
+    @staticmethod
+    def print_record(record: dict):
+        print("[{0}] iteration {1}, glued {2}, mobile {3}, {4:.0f} steps/s{5}".format(
+            record.get('job', '?'), record['iteration'], record['glued'], record['mobile'],
+            record['steps_per_second'], ', done' if record['final'] else ''))
+
+    def _drain(self):
+        while True:
+            try:
+                record = self.records.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if record is None:
+                return
+            self.latest[record.get('job')] = record
+            self.on_record(record)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.records.put(None)
+        self._thread.join()
@@ -1,6 +1,11 @@
 import glob
 import re
-import cv2
+import threading
+import time
+from collections import deque
+from enum import Enum, auto
+
+import numpy as np
 import os
 from typing import Optional
 
@@ -19,6 +24,8 @@ def assemble_video(input_pattern: str, output_path: str, fps: int) -> Optional[N
         None
     """
 
+    import cv2  # Loaded on first use, so simulations that record no video never import OpenCV
+
     # Step 1: Get all files matching the glob pattern
     file_paths = glob.glob(input_pattern)
 
@@ -75,4 +82,225 @@ def assemble_video(input_pattern: str, output_path: str, fps: int) -> Optional[N
 
     # Step 8: Release the video writer
     video_writer.release()
-    print(f"Video successfully saved to {output_path}")
\ No newline at end of file
+    print(f"Video successfully saved to {output_path}")
+
+# BGR colours per grid value (0 empty, 1 walker, 2 cluster)
+SQUARE_PALETTE = np.array([[84, 1, 68], [140, 145, 33], [37, 231, 253]], dtype=np.uint8)  # imshow's viridis
+HEXAGONAL_PALETTE = np.array([[255, 255, 255], [255, 0, 0], [0, 0, 255]], dtype=np.uint8)  # plot_hexagonal's
+
+
+class VideoSink:
+    """
+    Streams lattice snapshots straight into a cv2.VideoWriter, with no figures or intermediate files.
+
+    Every pixel of the frame is mapped to its grid cell once, so a frame is two gathers: grid values at
+    the mapped cells, then their colours from the palette lookup table. Triangular lattices use a brick
+    layout with odd rows shifted by half a cell and row 0 at the bottom, like plot_hexagonal. The first
+    and last frames are held for `hold_seconds`, like assemble_video.
+
+    Args:
+        output_path (str): The path where the video will be saved (e.g., "output/video.mp4").
+        n (int): Lattice size; write() reads the [0:n, 0:n] block of the grid it is given.
+        fps (int): Frames per second for the video.
+        stride (int): Only iterations that are a multiple of the stride become frames.
+        title (str): Text drawn in a band above the lattice, if any.
+        hexagonal (bool): Draw the staggered rows of a triangular lattice.
+        min_size (int): Cells are scaled up by an integer factor until the lattice is this many pixels wide.
+        hold_seconds (int): How long the first and last frames are shown.
+    """
+
+    def __init__(self, output_path: str, n: int, fps: int = 60, stride: int = 1, title: str = None,
+                 hexagonal: bool = False, min_size: int = 512, hold_seconds: int = 5):
+        import cv2  # Loaded on first use, as in assemble_video
+        self.output_path = output_path
+        self.n = n
+        self.stride = stride
+        self.hold_frames = fps * hold_seconds
+        self.frames = 0  # Frames written, holds excluded
+        self.render_seconds = 0.0  # Time spent mapping grids to frames
+        self.encode_seconds = 0.0  # Time spent in the encoder
+        self._palette = HEXAGONAL_PALETTE if hexagonal else SQUARE_PALETTE
+        self._pending = False  # An iteration was skipped since the last frame
+
+        scale = max(1, -(-min_size // n))
+        shift = scale // 2 if hexagonal else 0
+        band = 32 if title else 0
+        height, width = band + n * scale, n * scale + shift
+        height, width = height + height % 2, width + width % 2  # mp4v wants even dimensions
+
+        # Cell (row, column) shown by each pixel of the lattice area
+        rows = np.arange(height - band) // scale
+        if hexagonal:
+            rows = n - 1 - rows  # Row 0 at the bottom
+        columns = np.arange(width)[None, :] - np.where(rows % 2 == 1, shift, 0)[:, None]
+        self._outside = (rows[:, None] >= n) | (columns < 0) | (columns >= n * scale)
+        self._rows = np.clip(rows, 0, n - 1)[:, None]
+        self._columns = np.clip(columns // scale, 0, n - 1)
+        self._source = None  # Flat cell indices, built for the grid width seen by the first write()
+
+        self._frame = np.full((height, width, 3), 255, dtype=np.uint8)
+        self._body = self._frame[band:]
+        if title:
+            cv2.putText(self._frame, title, (8, band - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1,
+                        cv2.LINE_AA)
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # Codec for mp4 format
+        self._writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        if not self._writer.isOpened():
+            print(f"Error opening the video writer: {output_path}")
+
+    def _render(self, grid):
+        if self._source is None or self._source[1] != grid.shape[1]:
+            self._source = (self._rows * grid.shape[1] + self._columns, grid.shape[1])
+        values = np.take(grid.reshape(-1), self._source[0])
+        self._body[...] = np.take(self._palette, values, axis=0)
+        self._body[self._outside] = 255
+        return self._frame
+
+    def write(self, grid, iteration: int = None):
+        """Adds the grid as a frame, unless the iteration falls between strides."""
+        if iteration is not None and iteration % self.stride != 0:
+            self._pending = True
+            return
+        start = time.perf_counter()
+        frame = self._render(grid)
+        rendered = time.perf_counter()
+        for _ in range(self.hold_frames if self.frames == 0 else 0):
+            self._writer.write(frame)
+        self._writer.write(frame)
+        self.render_seconds += rendered - start
+        self.encode_seconds += time.perf_counter() - rendered
+        self.frames += 1
+        self._pending = False
+
+    def timings(self) -> dict:
+        return {'rendering': self.render_seconds, 'encoding': self.encode_seconds}
+
+    def close(self, grid=None):
+        """Holds the last frame and finalizes the file; `grid` is the final state, added if it was skipped."""
+        if grid is not None and (self._pending or self.frames == 0):
+            self.write(grid)
+        if self.frames:
+            frame = self._frame  # Already holds the last rendered frame
+            for _ in range(self.hold_frames):
+                self._writer.write(frame)
+        self._writer.release()
+        print(f"Video successfully saved to {self.output_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Backpressure(Enum):
+    BLOCK = auto()  # The simulation waits for a free slot: every frame is kept
+    DROP = auto()  # Frames arriving at a full queue are discarded
+    COALESCE = auto()  # A frame arriving at a full queue replaces the newest queued one
+
+
+class AsyncVideoSink:
+    """
+    VideoSink fed through a bounded queue: write() only copies the lattice into a uint8 snapshot, and a
+    background thread does the colour mapping and encoding. NumPy gathers and the OpenCV encoder release
+    the GIL, so a thread overlaps them with the simulation without pickling frames to another process.
+    When the encoder falls behind, `backpressure` decides between waiting, dropping and coalescing;
+    `dropped` counts the snapshots lost that way.
+
+    Args:
+        output_path (str): The path where the video will be saved (e.g., "output/video.mp4").
+        n (int): Lattice size; write() reads the [0:n, 0:n] block of the grid it is given.
+        max_queue (int): Snapshots waiting for the encoder at most.
+        backpressure (Backpressure): What write() does when the queue is full.
+        **kwargs: Passed on to VideoSink (fps, stride, title, hexagonal, ...).
+    """
+
+    def __init__(self, output_path: str, n: int, max_queue: int = 8,
+                 backpressure: Backpressure = Backpressure.COALESCE, **kwargs):
+        self.n = n
+        self.stride = kwargs.pop('stride', 1)
+        self.max_queue = max_queue
+        self.backpressure = backpressure
+        self.dropped = 0  # Snapshots discarded or coalesced away
+        self._sink = VideoSink(output_path, n, **kwargs)
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._pending = False  # An iteration was skipped since the last snapshot
+        self._queued = 0
+        self._error = None
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    @property
+    def frames(self):
+        return self._sink.frames
+
+    def timings(self) -> dict:
+        """Rendering and encoding time of the background thread."""
+        return self._sink.timings()
+
+    def _encode(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                snapshot = self._queue.popleft()
+                self._condition.notify_all()
+            try:
+                self._sink.write(snapshot)
+            except Exception as e:
+                self._error = e
+                with self._condition:
+                    self._queue.clear()
+                    self._closing = True
+                    self._condition.notify_all()
+                return
+
+    def _put(self, grid, backpressure):
+        if self._error is not None:
+            raise self._error
+        snapshot = grid[:self.n, :self.n].astype(np.uint8)
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                if backpressure == Backpressure.DROP:
+                    self.dropped += 1
+                    return
+                if backpressure == Backpressure.COALESCE:
+                    self._queue[-1] = snapshot
+                    self.dropped += 1
+                    return
+                while len(self._queue) >= self.max_queue and not self._closing:
+                    self._condition.wait()
+            self._queue.append(snapshot)
+            self._queued += 1
+            self._condition.notify_all()
+
+    def write(self, grid, iteration: int = None):
+        """Queues the grid as a frame, unless the iteration falls between strides."""
+        if iteration is not None and iteration % self.stride != 0:
+            self._pending = True
+            return
+        self._pending = False
+        self._put(grid, self.backpressure)
+
+    def close(self, grid=None):
+        """Flushes the queue, holds the last frame and finalizes the file; `grid` is the final state."""
+        if grid is not None and (self._pending or self._queued == 0):
+            self._put(grid, Backpressure.BLOCK)  # The final state is never dropped
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._sink.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()